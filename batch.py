@@ -0,0 +1,179 @@
+"""Пакетный расчёт спектров без графического интерфейса.
+
+Пример:
+    python batch.py "runs/*.txt" --time-step 1 --window Hann --autocorr \
+        --output results --format npz --plot png
+
+С --peaks пики каждого файла аппроксимируются, а общая таблица всех
+файлов сохраняется в peaks.csv — по ней видно, как смещаются полосы
+в серии расчётов. Спектры при этом берутся из кэша результатов.
+"""
+import os
+import sys
+import glob
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from choices import MULTITAPER, WELCH, ZOOM
+from export import (DATA_FORMATS, LINE_MODES, save_spectrum_plot, write_peaks,
+                    write_spectrum)
+from loader import load_trajectory
+from peaks import MAX_PEAKS, SHAPES, analyze_peaks
+from pipeline import SpectrumPipeline, file_stamp, load_masses
+from result_cache import ResultCache
+from spectrum import WINDOWS
+
+COMPONENT_NAMES = ["x", "y", "z", "modulus", "sum", "vdos"]
+METHOD_NAMES = {"fft": "FFT", "welch": WELCH, "zoom": ZOOM, "multitaper": MULTITAPER}
+
+
+def analyze_file(path, params, masses=None, dtype=np.float64, store=None):
+    """Загрузка и расчёт спектра одного файла; возвращает (частоты, спектр).
+
+    store — ResultCache: результат ищется в нём и сохраняется туда.
+    """
+    stamp = file_stamp(path)
+    pipeline = SpectrumPipeline(load_trajectory(path, dtype=dtype))
+    pipeline.set_masses(masses)
+    if store is not None:
+        pipeline.set_store(store, path, dtype, stamp)
+    return pipeline.compute(**params)
+
+
+def process_file(path, args, masses):
+    """Задание для пула процессов: расчёт, пики, сохранение данных и рисунка.
+
+    Возвращает путь к данным и PeakFit (None без --peaks).
+    """
+    dtype = np.float32 if args.float32 else np.float64
+    store = None if args.no_cache else ResultCache()
+    freqs, values = analyze_file(path, spectrum_params(args), masses, dtype, store)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_path = os.path.join(args.output, f"{name}.{args.format}")
+    write_spectrum(out_path, freqs, values)
+
+    fit = None
+    if args.peaks:
+        fit = analyze_peaks(freqs, values, args.freq_min, args.freq_max, args.peaks,
+                            args.prominence, args.max_peaks)
+
+    if args.plot:
+        title = "Спектр (автокорр.)" if args.autocorr else "Спектр"
+        save_spectrum_plot(os.path.join(args.output, f"{name}.{args.plot}"),
+                           freqs, values, args.dpi, args.vector_line,
+                           color=args.color, title=title,
+                           freq_min=args.freq_min, freq_max=args.freq_max,
+                           peaks=fit)
+    return out_path, fit
+
+
+def spectrum_params(args):
+    return dict(
+        component=COMPONENT_NAMES.index(args.component),
+        time_step=args.time_step * 1e-15,
+        window=args.window,
+        autocorr=args.autocorr,
+        null_points=args.null_points,
+        method=METHOD_NAMES[args.method],
+        segment=args.segment,
+        overlap=args.overlap,
+        freq_min=args.freq_min,
+        freq_max=args.freq_max,
+        zoom_points=args.zoom_points,
+        nw=args.nw,
+        n_tapers=args.tapers,
+        adaptive=not args.no_adaptive,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Пакетный расчёт спектров траекторий")
+    parser.add_argument("inputs", nargs="+",
+                        help="файлы или шаблоны (например, 'runs/*.txt')")
+    parser.add_argument("-o", "--output", default="spectra",
+                        help="каталог для результатов")
+    parser.add_argument("--format", choices=DATA_FORMATS, default="csv")
+    parser.add_argument("--plot", choices=["png", "jpg", "pdf", "svg"],
+                        help="сохранить также рисунок в этом формате")
+    parser.add_argument("--vector-line", choices=LINE_MODES, default="decimate",
+                        help="линия в PDF/SVG: прореживание, растр или все точки")
+    parser.add_argument("--component", choices=COMPONENT_NAMES, default="x")
+    parser.add_argument("--time-step", type=float, default=1.0,
+                        help="шаг времени, фс")
+    parser.add_argument("--window", choices=["None"] + list(WINDOWS), default="None")
+    parser.add_argument("--autocorr", action="store_true")
+    parser.add_argument("--null-points", type=int, default=0)
+    parser.add_argument("--method", choices=list(METHOD_NAMES), default="fft")
+    parser.add_argument("--segment", type=int, default=4096)
+    parser.add_argument("--overlap", type=int, default=50, help="перекрытие, %%")
+    parser.add_argument("--zoom-points", type=int, default=4096,
+                        help="число частот от --freq-min до --freq-max для zoom")
+    parser.add_argument("--nw", type=float, default=4,
+                        help="полуширина полосы тапер DPSS (мультитапер)")
+    parser.add_argument("--tapers", type=int, default=0,
+                        help="число тапер; 0 — 2·NW − 1")
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="усреднять спектры тапер поровну")
+    parser.add_argument("--peaks", choices=SHAPES,
+                        help="найти пики в диапазоне частот и подогнать линии этой формы")
+    parser.add_argument("--prominence", type=float, default=0.05,
+                        help="мин. выступание пика, доля максимума в диапазоне")
+    parser.add_argument("--max-peaks", type=int, default=MAX_PEAKS)
+    parser.add_argument("--masses", help="файл с массами атомов для VDOS")
+    parser.add_argument("--float32", action="store_true")
+    parser.add_argument("--freq-min", type=float, default=0)
+    parser.add_argument("--freq-max", type=float, default=0)
+    parser.add_argument("--color", default="blue")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--no-cache", action="store_true",
+                        help="не использовать кэш результатов на диске")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="число процессов")
+    return parser.parse_args(argv)
+
+
+def expand_inputs(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        paths.extend(p for p in matches if p not in paths)
+    return paths
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = expand_inputs(args.inputs)
+    masses = load_masses(args.masses) if args.masses else None
+    os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    fits = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(process_file, path, args, masses): path
+                   for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                out_path, fits[path] = future.result()
+                print(f"[{done}/{len(paths)}] {path} -> {out_path}")
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(paths)}] {path}: ошибка: {e}", file=sys.stderr)
+
+    if args.peaks:
+        # Таблица в порядке входных файлов, а не завершения заданий
+        peaks_path = os.path.join(args.output, "peaks.csv")
+        write_peaks(peaks_path, [(os.path.basename(path), fits[path])
+                                 for path in paths if path in fits])
+        print(f"Пики: {peaks_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
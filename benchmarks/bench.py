@@ -0,0 +1,236 @@
+"""Замеры скорости и памяти этапов: загрузка, расчёт, отрисовка, сохранение
+графика и данных.
+
+Синтетические файлы из 4 столбцов (x, y, z, модуль) создаются один раз
+в рабочем каталоге. Каждый этап выполняется без окна: отрисовка — через
+Agg, а если установлен PyQt5 — ещё и через окно приложения на платформе
+offscreen. Результаты сохраняются в JSON и могут сравниваться с базовым
+прогоном:
+
+    python benchmarks/bench.py --sizes 1e4 1e5 1e6 --output new.json
+    python benchmarks/bench.py --baseline old.json --threshold 0.2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import scipy  # noqa: E402
+import matplotlib  # noqa: E402
+matplotlib.use("Agg")
+
+from choices import COMPONENTS  # noqa: E402
+from export import save_spectrum_plot, spectrum_figure, write_spectrum  # noqa: E402
+from instrumentation import peak_rss  # noqa: E402
+from loader import load_trajectory  # noqa: E402
+from pipeline import SpectrumPipeline  # noqa: E402
+
+WINDOWS = ["None", "Hann"]
+COMPONENT_INDICES = [0, 3, 4]  # x, модуль, сумма x+y+z
+ROWS_PER_WRITE = 1_000_000
+
+
+def make_trajectory(path, n_samples, seed=0):
+    """Синусоида на 1000 см⁻¹ с шумом; пишется кусками, чтобы не держать 1e8 строк"""
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for start in range(0, n_samples, ROWS_PER_WRITE):
+            t = np.arange(start, min(start + ROWS_PER_WRITE, n_samples)) * 1e-15
+            xyz = np.sin(2 * np.pi * 3e13 * t)[:, None] + 0.3 * rng.standard_normal((len(t), 3))
+            block = np.column_stack((xyz, np.linalg.norm(xyz, axis=1)))
+            np.savetxt(f, block, fmt="%.6e")
+
+
+def measure(func, repeat, setup=None):
+    """Лучшее время из repeat запусков и пик выделенной памяти (tracemalloc).
+
+    Время замеряется без tracemalloc — он заметно замедляет выделение памяти
+    и разбор текста, — пик памяти берётся из отдельного запуска. setup()
+    вызывается перед каждым запуском и в замер не входит.
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, stage, size, params, func, setup=None):
+        seconds, peak, result = measure(func, self.repeat, setup)
+        self.results.append({"stage": stage, "size": size, "params": params,
+                             "seconds": seconds, "peak_bytes": peak})
+        print(f"{stage:<10} {size:>10} {json.dumps(params, ensure_ascii=False):<60} "
+              f"{seconds:9.4f} с {peak / 2**20:9.1f} МБ")
+        return result
+
+
+def remove_sidecar(path):
+    for suffix in (".float64.bin", ".float64.json"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def bench_size(bench, path, size, gui):
+    # Холодная загрузка — каждый повтор без кэша, созданного предыдущим
+    bench.run("load", size, {"cache": "cold"}, lambda: load_trajectory(path),
+              setup=lambda: remove_sidecar(path))
+    data = bench.run("load", size, {"cache": "warm"}, lambda: load_trajectory(path))
+
+    freqs = values = None
+    for component in COMPONENT_INDICES:
+        for window in WINDOWS:
+            for autocorr in (False, True):
+                params = {"component": COMPONENTS[component], "window": window,
+                          "autocorr": autocorr}
+                # Новый конвейер на каждый запуск: замеряется расчёт без кэша
+                freqs, values = bench.run(
+                    "compute", size, params,
+                    lambda: SpectrumPipeline(data).compute(
+                        component, 1e-15, window, autocorr, 0))
+
+    bench.run("render", size, {"backend": "Agg"},
+              lambda: draw(spectrum_figure(freqs, values)))
+    # Сохранение, как в приложении: рисунок строится заново с прореживанием линии
+    for fmt, dpi in (("png", 300), ("png", 1200), ("svg", 300)):
+        target = os.path.join(os.path.dirname(path), f"bench.{fmt}")
+        bench.run("save", size, {"format": fmt, "dpi": dpi},
+                  lambda: save_spectrum_plot(target, freqs, values, dpi))
+    for fmt in ("csv", "npy"):
+        target = os.path.join(os.path.dirname(path), f"bench_data.{fmt}")
+        bench.run("export", size, {"format": fmt},
+                  lambda: write_spectrum(target, freqs, values))
+
+    if gui is not None:
+        bench.run("render", size, {"backend": "QtAgg offscreen"},
+                  lambda: gui_render(gui, data, freqs, values))
+
+
+def draw(figure):
+    figure.canvas.draw()
+    return figure
+
+
+def make_gui():
+    """Окно приложения на платформе offscreen; None, если PyQt5 не установлен"""
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        return None
+    app = QApplication.instance() or QApplication([])
+    from main import SpectralAnalyzer
+    window = SpectralAnalyzer()
+    window._app = app
+    return window
+
+
+def gui_render(window, data, freqs, values):
+    window.pipeline = SpectrumPipeline(data)
+    window.render_spectrum(freqs, values)
+    window.canvas.draw()
+
+
+def compare(results, baseline_path, threshold):
+    """Список этапов, ставших медленнее базовых больше чем на threshold"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    def key(r):
+        return r["stage"], r["size"], json.dumps(r["params"], sort_keys=True)
+
+    reference = {key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = reference.get(key(r))
+        if old is not None and r["seconds"] > old["seconds"] * (1 + threshold):
+            regressions.append((r, old))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры этапов анализатора спектра")
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e4, 1e5, 1e6],
+                        help="число точек траектории (до 1e8)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(),
+                                                          "spectral_bench"),
+                        help="каталог для синтетических файлов")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-gui", action="store_true",
+                        help="не замерять отрисовку в окне приложения")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимое замедление, доля (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+    gui = None if args.no_gui else make_gui()
+    bench = Bench(args.repeat)
+
+    for size in (int(s) for s in args.sizes):
+        path = os.path.join(args.workdir, f"traj_{size}.txt")
+        if not os.path.exists(path):
+            print(f"Создаётся {path}...")
+            make_trajectory(path, size)
+        bench_size(bench, path, size, gui)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "matplotlib": matplotlib.__version__,
+            "cpu_count": os.cpu_count(),
+            "peak_rss_bytes": peak_rss(),
+        },
+        "results": bench.results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"Результаты: {args.output}")
+
+    if args.baseline:
+        regressions = compare(bench.results, args.baseline, args.threshold)
+        for new, old in regressions:
+            print(f"Замедление: {new['stage']} {new['size']} {new['params']}: "
+                  f"{old['seconds']:.4f} -> {new['seconds']:.4f} с")
+        if regressions:
+            return 1
+        print("Замедлений нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Сборка приложения PyInstaller и замер холодного старта.
+
+    python build.py               # сборка по spec-файлу и замер
+    python build.py --no-build    # только замер исходников и готовой сборки
+
+Время старта — от запуска процесса до первой отрисовки окна: с флагом
+--startup-probe приложение закрывается сразу после показа. Первый запуск
+после сборки самый медленный (файлы ещё не в кэше ОС), поэтому он
+выводится отдельно от лучшего и медианного времени.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SPEC = os.path.join(ROOT, "Анализатор спектра.spec")
+APP_NAME = "Анализатор спектра"
+BUNDLE_NAME = "programm"  # имя каталога сборки (COLLECT в spec-файле)
+
+
+def executable_path(dist_dir):
+    name = APP_NAME + (".exe" if sys.platform == "win32" else "")
+    return os.path.join(dist_dir, BUNDLE_NAME, name)
+
+
+def directory_size(path):
+    """Размер каталога без учёта символических ссылок (повторов библиотек)"""
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(root, name)
+            if not os.path.islink(file_path):
+                total += os.path.getsize(file_path)
+    return total
+
+
+def build(dist_dir, work_dir):
+    subprocess.run([sys.executable, "-m", "PyInstaller", SPEC, "--noconfirm",
+                    "--distpath", dist_dir, "--workpath", work_dir],
+                   check=True, cwd=ROOT)
+
+
+def measure_startup(command, repeat):
+    """Время до первой отрисовки окна: первый запуск, лучший и медиана"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command + ["--startup-probe"], check=True, cwd=ROOT,
+                       timeout=300)
+        times.append(time.perf_counter() - start)
+    return {"first": times[0], "best": min(times),
+            "median": statistics.median(times), "runs": times}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сборка и замер холодного старта")
+    parser.add_argument("--no-build", action="store_true",
+                        help="не собирать, только замерить")
+    parser.add_argument("--dist", default=os.path.join(ROOT, "dist"),
+                        help="каталог готовой сборки")
+    parser.add_argument("--work", default=os.path.join(ROOT, "build"),
+                        help="временный каталог PyInstaller")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="startup.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.no_build:
+        build(args.dist, args.work)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+        },
+        "startup": {
+            "source": measure_startup([sys.executable, os.path.join(ROOT, "main.py")],
+                                      args.repeat),
+        },
+    }
+    executable = executable_path(args.dist)
+    if os.path.exists(executable):
+        report["startup"]["bundle"] = measure_startup([executable], args.repeat)
+        report["bundle_bytes"] = directory_size(os.path.dirname(executable))
+        print(f"Размер сборки: {report['bundle_bytes'] / 2**20:.1f} МБ")
+    else:
+        print(f"Сборка не найдена: {executable}")
+
+    for name, result in report["startup"].items():
+        print(f"Старт ({name}): первый {result['first']:.2f} с, "
+              f"лучший {result['best']:.2f} с, медиана {result['median']:.2f} с")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    print(f"Результаты: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
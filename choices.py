@@ -0,0 +1,16 @@
+"""Компоненты и методы расчёта спектра.
+
+Модуль не зависит от NumPy и SciPy: главное окно заполняет по нему
+списки и показывается до импорта тяжёлых библиотек.
+"""
+COMPONENTS = ["x-компонент", "y-компонент", "z-компонент", "Модуль",
+              "Сумма x+y+z", "VDOS (все атомы)"]
+MODULUS = 3
+SUM_XYZ = 4
+VDOS = 5
+
+METHODS = ["FFT", "Уэлч", "Спектрограмма", "Зум-FFT", "Мультитапер"]
+WELCH = "Уэлч"
+SPECTROGRAM = "Спектрограмма"
+ZOOM = "Зум-FFT"
+MULTITAPER = "Мультитапер"
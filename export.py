@@ -0,0 +1,155 @@
+import os
+import csv
+
+import numpy as np
+
+from plotting import annotate_peaks, minmax_decimate
+
+DATA_FORMATS = ["csv", "npy", "npz", "h5"]
+VECTOR_FORMATS = [".pdf", ".svg", ".eps", ".ps"]
+# Линия в векторных форматах: прореживание, растр или все точки
+LINE_MODES = ["decimate", "rasterize", "full"]
+CSV_ROWS = 1 << 16  # строк CSV, форматируемых за один раз
+
+
+def write_spectrum(path, freqs, values):
+    """Сохраняет спектр; формат определяется расширением файла.
+
+    Данные пишутся по частям или напрямую в файл, без промежуточной
+    строки или копии всего спектра в памяти. HDF5 требует пакета h5py.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        _write_csv(path, freqs, values)
+    elif ext == ".npy":
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64,
+                                        shape=(len(freqs), 2))
+        out[:, 0] = freqs
+        out[:, 1] = values
+        out.flush()
+        del out
+    elif ext == ".npz":
+        np.savez(path, freqs=freqs, values=values)
+    elif ext in (".h5", ".hdf5"):
+        _write_hdf5(path, freqs, values)
+    else:
+        raise ValueError(f"неизвестный формат данных: {ext}")
+
+
+def _write_csv(path, freqs, values):
+    with open(path, "w", encoding="ascii", newline="\n") as f:
+        f.write("wavenumber_cm-1,intensity\n")
+        for start in range(0, len(freqs), CSV_ROWS):
+            block = np.column_stack((freqs[start:start + CSV_ROWS],
+                                     values[start:start + CSV_ROWS]))
+            f.write("%.18e,%.18e\n" * len(block) % tuple(block.ravel()))
+
+
+def _write_hdf5(path, freqs, values):
+    try:
+        import h5py
+    except ImportError:
+        raise ValueError("для HDF5 нужен пакет h5py (pip install h5py)") from None
+    with h5py.File(path, "w") as f:
+        f.create_dataset("freqs", data=freqs, chunks=True)
+        f.create_dataset("values", data=values, chunks=True)
+        f["freqs"].attrs["units"] = "cm-1"
+
+
+PEAK_COLUMNS = ["file", "shape", "peak", "position_cm-1", "amplitude",
+                "fwhm_cm-1", "area"]
+
+
+def write_peaks(path, fits):
+    """Таблица пиков в CSV; fits — пары (имя файла, PeakFit).
+
+    По строке на пик; по столбцу position_cm-1 удобно следить за
+    положением полос в серии расчётов.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(PEAK_COLUMNS)
+        for name, fit in fits:
+            for i, row in enumerate(zip(fit.position, fit.amplitude, fit.width,
+                                        fit.area), 1):
+                writer.writerow([name, fit.shape, i] + [f"{v:.8g}" for v in row])
+
+
+def spectrum_figure(freqs, values, color="blue", title="Спектр",
+                    xlabel="Частота (см⁻¹)", ylabel="Интенсивность",
+                    freq_min=0, freq_max=0, ylim=None, bins=None, rasterized=False,
+                    peaks=None):
+    """Рисунок спектра без GUI (backend Agg), оформленный как в приложении.
+
+    bins — min/max-прореживание видимого диапазона до bins корзин;
+    rasterized — линия сохраняется растром и в векторных форматах;
+    peaks — PeakFit, отмечаемый на рисунке.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    if bins is not None:
+        if freq_min < freq_max:
+            freqs, values = minmax_decimate(freqs, values, freq_min, freq_max, bins)
+        else:
+            freqs, values = minmax_decimate(freqs, values, freqs[0], freqs[-1], bins)
+    ax.plot(freqs, values, color=color, rasterized=rasterized)
+    if peaks is not None:
+        if freq_min < freq_max:
+            annotate_peaks(ax, peaks, freq_min, freq_max)
+        else:
+            annotate_peaks(ax, peaks, freqs[0], freqs[-1])
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+    if freq_min < freq_max:
+        ax.set_xlim(freq_min, freq_max)
+    if ylim is not None:
+        ax.set_ylim(ylim)
+    return figure
+
+
+def spectrogram_figure(power_db, extent, cmap="viridis", title="Спектрограмма",
+                       xlabel="Время (пс)", ylabel="Частота (см⁻¹)",
+                       xlim=None, ylim=None):
+    """Рисунок спектрограммы без GUI; power_db — (частоты, кадры), как на экране"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    image = ax.imshow(power_db, origin='lower', aspect='auto', extent=extent,
+                      interpolation='nearest', vmin=-60, vmax=0, cmap=cmap)
+    figure.colorbar(image, ax=ax, label="дБ")
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if xlim is not None:
+        ax.set_xlim(xlim)
+    if ylim is not None:
+        ax.set_ylim(ylim)
+    return figure
+
+
+def save_spectrum_plot(path, freqs, values, dpi=300, line_mode="decimate", **style):
+    """Сохраняет рисунок спектра; style — параметры spectrum_figure.
+
+    Линия прореживается до двух точек на пиксель при заданном DPI — на вид
+    это та же линия, а отрисовка и файл во много раз меньше. В векторных
+    форматах line_mode выбирает: "decimate" — прорежённая векторная линия,
+    "rasterize" — линия растром (оси и подписи остаются векторными),
+    "full" — все точки без прореживания.
+    """
+    vector = os.path.splitext(path)[1].lower() in VECTOR_FORMATS
+    bins = None
+    if not vector or line_mode != "full":
+        from matplotlib import rcParams
+        bins = int(rcParams["figure.figsize"][0] * dpi)
+    figure = spectrum_figure(freqs, values, bins=bins,
+                             rasterized=vector and line_mode == "rasterize", **style)
+    figure.savefig(path, dpi=dpi, bbox_inches='tight')
@@ -0,0 +1,19 @@
+# Замещает встроенный hook PyQt5 из PyInstaller (подключается через
+# hookspath в spec-файле): то же содержимое плюс excludedimports, чтобы
+# неиспользуемые модули Qt не попадали в сборку через импорты PyQt5.
+# Лишние плагины и библиотеки Qt отбрасываются в spec-файле (EXCLUDED_FILES).
+from PyInstaller.utils.hooks.qt import ensure_single_qt_bindings_package, pyqt5_library_info
+
+ensure_single_qt_bindings_package("PyQt5")
+
+if pyqt5_library_info.version is not None:
+    hiddenimports = ['sip', 'PyQt5.sip', 'pkgutil']
+    binaries = pyqt5_library_info.collect_extra_binaries()
+
+excludedimports = [
+    'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtQuickWidgets', 'PyQt5.QtWebSockets',
+    'PyQt5.QtWebChannel', 'PyQt5.QtWebEngineCore', 'PyQt5.QtWebEngineWidgets',
+    'PyQt5.QtMultimedia', 'PyQt5.QtBluetooth', 'PyQt5.QtPositioning',
+    'PyQt5.QtLocation', 'PyQt5.QtSensors', 'PyQt5.QtSerialPort', 'PyQt5.QtSql',
+    'PyQt5.QtTest', 'PyQt5.QtDesigner', 'PyQt5.QtHelp', 'PyQt5.QtOpenGL',
+]
@@ -0,0 +1,176 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+LOG_DIR = os.environ.get(
+    "SPECTRAL_LOG_DIR",
+    os.path.join(os.path.expanduser("~"), ".spectral_analyzer", "logs"))
+LOG_PATH = os.path.join(LOG_DIR, "timings.jsonl")
+
+STAGE_NAMES = {
+    "parse": "чтение",
+    "signal": "выборка",
+    "window": "окно",
+    "autocorr": "автокорр.",
+    "fft": "FFT",
+    "normalize": "нормировка",
+    "freqs": "частоты",
+    "null": "обнуление",
+    "stft": "STFT",
+    "hash": "хеш файла",
+    "cache": "кэш на диске",
+    "store": "запись в кэш",
+    "peaks": "пики",
+    "tapers": "тапера DPSS",
+    "draw": "отрисовка",
+}
+
+_log_lock = threading.Lock()
+
+
+def peak_rss():
+    """Пиковый RSS процесса в байтах (None, если узнать нельзя)"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class StageTimer:
+    """Время и пик выделенной памяти по этапам одного расчёта.
+
+    Память учитывается через tracemalloc (если track_memory), который
+    видит и выделения массивов NumPy; это заметно замедляет расчёт,
+    поэтому по умолчанию выключено; трассировка включается только на время
+    этапа. Этапы, взятые из кэша, не замеряются. Время и пик этапа —
+    собственные: вложенные этапы записываются отдельно и из внешнего
+    исключаются, так что сумма по этапам не превышает время расчёта.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = []
+        self._open = []  # открытые этапы: [время вложенных, пик до вложенных]
+
+    @contextmanager
+    def stage(self, name):
+        # Трассировку останавливает тот этап, который её начал (вложенный
+        # этап её не выключает), иначе она замедляла бы и всё дальнейшее
+        started = self.track_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.track_memory:
+            if self._open:
+                # Пик внешнего этапа до вложенного, иначе его сотрёт reset_peak
+                outer = self._open[-1]
+                outer[1] = max(outer[1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = [0.0, 0]
+        self._open.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._open.pop()
+            peak = None
+            if self.track_memory:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if self._open:
+                    tracemalloc.reset_peak()
+            if started:
+                tracemalloc.stop()
+            self.record(name, seconds - frame[0], peak, seconds)
+
+    def record(self, name, seconds, peak_bytes=None, elapsed=None):
+        """Этап, время которого измерено снаружи.
+
+        elapsed — полное время вместе с вложенными этапами (по умолчанию
+        seconds); оно исключается из открытого внешнего этапа.
+        """
+        self.stages.append({"stage": name, "seconds": seconds, "peak_bytes": peak_bytes})
+        if self._open:
+            self._open[-1][0] += seconds if elapsed is None else elapsed
+
+    def has(self, name):
+        return any(s["stage"] == name for s in self.stages)
+
+    def total(self):
+        return sum(s["seconds"] for s in self.stages)
+
+    def summary(self):
+        """Строка для строки состояния: самые заметные этапы"""
+        parts = []
+        for s in self.stages:
+            if s["seconds"] < 0.001:
+                continue
+            text = f"{STAGE_NAMES.get(s['stage'], s['stage'])} {s['seconds']:.3f} с"
+            if s["peak_bytes"] is not None:
+                text += f" ({s['peak_bytes'] / 2**20:.0f} МБ)"
+            parts.append(text)
+        return " · ".join(parts) if parts else "из кэша"
+
+
+def log_run(kind, params, timer, path=None):
+    """Дописывает замер в журнал JSON Lines; ошибки записи не мешают работе"""
+    _append({
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kind": kind,
+        "params": params,
+        "stages": timer.stages,
+        "total_seconds": timer.total(),
+        "peak_rss_bytes": peak_rss(),
+    }, path)
+
+
+def log_error(kind, params, message, path=None):
+    """Дописывает в тот же журнал ошибку расчёта"""
+    _append({
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "kind": kind,
+        "params": params,
+        "error": message,
+    }, path)
+
+
+def _append(record, path=None):
+    path = path or LOG_PATH
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    except OSError:
+        pass
+
+
+def profiled(func, path=None):
+    """Оборачивает func так, что её вызов профилируется cProfile.
+
+    Профиль сохраняется в path (по умолчанию — profile-<время>.prof
+    в каталоге журнала) и открывается через pstats или snakeviz.
+    """
+    if path is None:
+        path = os.path.join(LOG_DIR, time.strftime("profile-%Y%m%d-%H%M%S.prof"))
+
+    def wrapper(*args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profile.dump_stats(path)
+
+    wrapper.path = path
+    return wrapper
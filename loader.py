@@ -0,0 +1,262 @@
+import io
+import os
+import json
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+CHUNK_SIZE = 16 * 1024 * 1024  # байт текста на один поток разбора
+CACHE_DIR = os.environ.get(
+    "SPECTRAL_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".spectral_analyzer", "cache"))
+CACHE_VERSION = 1
+DIGEST_INDEX = os.path.join(CACHE_DIR, "digests.json")
+
+
+def _count_columns(path):
+    """Число столбцов по первой непустой строке без комментария"""
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.split(b"#", 1)[0].strip()
+            if line:
+                return len(line.split())
+    raise ValueError("файл не содержит данных")
+
+
+def _chunk_bounds(path, size, chunk_size):
+    """Делит файл на куски, границы которых совпадают с концами строк"""
+    bounds = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < size:
+            end = min(start + chunk_size, size)
+            if end < size:
+                f.seek(end)
+                end += len(f.readline())
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _parse_chunk(path, start, end, n_columns, dtype):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return _parse_bytes(f.read(end - start), n_columns, dtype)
+
+
+def _even_lines(raw, n_columns):
+    """Во всех непустых строках ровно n_columns значений"""
+    text = np.frombuffer(raw, dtype=np.uint8)
+    if text.size == 0:
+        return True
+    space = text <= 32  # пробел, табуляция, переводы строки
+    # Начало значения — непробельный байт после пробельного или начала куска
+    starts = ~space
+    starts[1:] &= space[:-1]
+    values = np.flatnonzero(starts)
+    # Число значений до каждого перевода строки и в последней строке
+    ends = np.searchsorted(values, np.flatnonzero(text == 10))
+    widths = np.diff(np.concatenate(([0], ends, [len(values)])))
+    return bool(np.all((widths == 0) | (widths == n_columns)))
+
+
+def _parse_bytes(raw, n_columns, dtype):
+    # Быстрый разбор не видит границ строк, поэтому строки с другим числом
+    # значений сдвинули бы все следующие — их ищет _even_lines
+    if b"#" not in raw and _even_lines(raw, n_columns):
+        values = np.fromstring(raw.decode("ascii"), dtype=dtype, sep=" ")
+        if values.size % n_columns == 0:
+            return values.reshape(-1, n_columns)
+    # Комментарии или неровные строки: медленный, но строгий разбор
+    return np.loadtxt(io.BytesIO(raw), dtype=dtype, ndmin=2)
+
+
+class TailReader:
+    """Чтение растущего текстового файла: каждый вызов read_new() разбирает
+    только строки, дописанные после предыдущего вызова.
+
+    Незавершённая последняя строка (без перевода строки) откладывается до
+    следующего чтения. Если файл стал короче, чтение начинается заново,
+    а reset выставляется в True. За один вызов читается не больше
+    chunk_size байт, так что память не зависит от объёма уже записанного
+    файла; pending — в файле остались непрочитанные строки.
+    """
+
+    def __init__(self, path, dtype=np.float64, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.n_columns = None
+        self.reset = False
+        self.pending = False
+
+    def read_new(self):
+        """Новые полные строки массивом (n, столбцы); n может быть 0"""
+        size = os.path.getsize(self.path)
+        self.reset = size < self.offset
+        if self.reset:
+            self.offset = 0
+        self.pending = False
+        if size == self.offset:
+            return np.empty((0, self.n_columns or 0), dtype=self.dtype)
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            raw = f.read(min(size - self.offset, self.chunk_size))
+            # Строка длиннее куска дочитывается до конца
+            while b"\n" not in raw and self.offset + len(raw) < size:
+                raw += f.read(self.chunk_size)
+        self.pending = self.offset + len(raw) < size
+        end = raw.rfind(b"\n") + 1
+        if end == 0:
+            return np.empty((0, self.n_columns or 0), dtype=self.dtype)
+        raw = raw[:end]
+
+        if self.n_columns is None:
+            lines = (line.split(b"#", 1)[0].split() for line in raw.splitlines())
+            first = next((line for line in lines if line), None)
+            if first is None:
+                self.offset += end
+                return np.empty((0, 0), dtype=self.dtype)
+            self.n_columns = len(first)
+
+        block = _parse_bytes(raw, self.n_columns, self.dtype)
+        if block.size and block.shape[1] != self.n_columns:
+            raise ValueError("строки с разным числом столбцов")
+        self.offset += end
+        return block
+
+
+def _sidecar_base(path, dtype):
+    """Путь кэша рядом с файлом; если каталог недоступен для записи — в CACHE_DIR"""
+    suffix = f".{np.dtype(dtype).name}"
+    directory = os.path.dirname(os.path.abspath(path))
+    if os.access(directory, os.W_OK):
+        return os.path.abspath(path) + suffix
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, digest + suffix)
+
+
+def _read_sidecar(base, stat):
+    try:
+        with open(base + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (meta.get("version") != CACHE_VERSION
+            or meta.get("size") != stat.st_size
+            or meta.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    return np.memmap(base + ".bin", dtype=meta["dtype"], mode="r",
+                     shape=tuple(meta["shape"]))
+
+
+def file_digest(path):
+    """Хеш содержимого файла (BLAKE2b) — ключ результатов в дисковом кэше.
+
+    Хеши запоминаются в DIGEST_INDEX по пути, размеру и времени изменения:
+    повторно тот же файл не читается. Копия файла на другом пути или
+    машине даёт тот же хеш.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    try:
+        with open(DIGEST_INDEX, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(path)
+    if (entry is not None and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns):
+        return entry["digest"]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                   "digest": digest.hexdigest()}
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{DIGEST_INDEX}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, DIGEST_INDEX)
+    except OSError:
+        pass
+    return index[path]["digest"]
+
+
+def parse_text(path, out, dtype=np.float64, workers=None, progress=None):
+    """Разбирает текстовый файл в несколько потоков и пишет строки в out.
+
+    Куски обрабатываются параллельно, но записываются по порядку; в памяти
+    одновременно находится не больше 2 * workers кусков.
+    Возвращает форму прочитанного массива.
+    """
+    size = os.path.getsize(path)
+    n_columns = _count_columns(path)
+    bounds = _chunk_bounds(path, size, CHUNK_SIZE)
+    workers = workers or os.cpu_count() or 1
+
+    rows = 0
+    done = 0
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start, end in bounds:
+            pending.append((end - start, pool.submit(
+                _parse_chunk, path, start, end, n_columns, dtype)))
+            while len(pending) >= 2 * workers or (pending and end == size):
+                nbytes, future = pending.popleft()
+                block = future.result()
+                if block.size and block.shape[1] != n_columns:
+                    raise ValueError("строки с разным числом столбцов")
+                out.write(block.tobytes())
+                rows += len(block)
+                done += nbytes
+                if progress is not None:
+                    progress(done, size)
+    return rows, n_columns
+
+
+def load_trajectory(path, dtype=np.float64, workers=None, progress=None):
+    """Загружает траекторию как memmap на бинарный кэш рядом с файлом.
+
+    При первом открытии текст разбирается и сохраняется в <файл>.<dtype>.bin,
+    при следующих (пока не изменились размер и время модификации файла)
+    данные отображаются в память без разбора и копирования.
+    """
+    dtype = np.dtype(dtype)
+    stat = os.stat(path)
+    base = _sidecar_base(path, dtype)
+
+    data = _read_sidecar(base, stat)
+    if data is not None:
+        if progress is not None:
+            progress(stat.st_size, stat.st_size)
+        return data
+
+    tmp_path = base + ".bin.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            shape = parse_text(path, out, dtype, workers, progress)
+        os.replace(tmp_path, base + ".bin")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "dtype": dtype.name,
+        "shape": list(shape),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return np.memmap(base + ".bin", dtype=dtype, mode="r", shape=shape)
@@ -1,14 +1,20 @@
+import os
 import sys
-import numpy as np
 from PyQt5 import QtWidgets
-from PyQt5.QtCore import QTimer
-import matplotlib.pyplot as plt
+from PyQt5.QtCore import Qt, QEventLoop, QTimer
 from ui import Ui_mainWindow
-from scipy.fft import fft, fftfreq
-from scipy.signal import correlate
-from matplotlib.figure import Figure
+from choices import COMPONENTS, METHODS, MULTITAPER, SPECTROGRAM, WELCH, ZOOM
+from workers import JobRunner, TaskQueue
+from instrumentation import StageTimer, log_error, log_run, profiled
 from PyQt5.QtWidgets import QApplication, QMainWindow, QFileDialog
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+# NumPy, SciPy и Matplotlib импортируются при первой загрузке файла
+# и первом построении: окно показывается, не дожидаясь их
+
+# Подписи режимов export.LINE_MODES: прореживание, растр, все точки
+LINE_MODE_LABELS = ["Прореживать", "Растром", "Все точки"]
+PEAK_SHAPE_LABELS = ["Лоренц", "Гаусс"]  # в порядке peaks.SHAPES
+PEAK_TABLE_COLUMNS = ["Частота, см⁻¹", "Высота", "Ширина, см⁻¹", "Площадь"]
 
 
 class SpectralAnalyzer(QMainWindow, Ui_mainWindow):
@@ -17,6 +23,23 @@ class SpectralAnalyzer(QMainWindow, Ui_mainWindow):
         self.setupUi(self)
         self.data = None
         self.autocorr_enabled = False
+        self.pipeline = None  # создаётся при загрузке данных
+        self.data_stamp = None  # размер и время изменения файла при загрузке
+        self.data_dtype = None
+        self.spectrum_jobs = JobRunner(self)
+        self.spectrum_jobs.finished.connect(self.on_spectrum_ready)
+        self.spectrum_jobs.failed.connect(self.on_spectrum_failed)
+        self.spectrum_jobs.progress.connect(self.show_progress)
+        self.ax = None
+        self.line = None
+        self.spectrum = None  # полные (частоты, значения); на линии — прореженные
+        self.full_xlim = None
+        self.background = None
+        self.image = None  # спектрограмма вместо линии спектра
+        self.spectrogram_extent = None
+        self.peak_fit = None  # PeakFit последнего расчёта с поиском пиков
+        self.drawn_peak_fit = None
+        self.peak_artists = []
 
         # Инициализация значений по умолчанию
         self.time_step_spin.setValue(1)
@@ -27,18 +50,160 @@ class SpectralAnalyzer(QMainWindow, Ui_mainWindow):
         self.null_points_spin.setRange(0, 10000)  
         self.null_points_spin.setValue(0)
         
-        # Graph init
-        self.figure = Figure()
-        self.canvas = FigureCanvas(self.figure)
+        # Graph init: холст создаётся при первом построении (init_canvas)
+        self.figure = None
+        self.canvas = None
         
         # Заменяем QGraphicsView на наш canvas
         if self.widget.layout() is not None:
             QtWidgets.QWidget().setLayout(self.widget.layout()) 
         self.widget.setLayout(QtWidgets.QVBoxLayout())
-        self.widget.layout().addWidget(self.canvas) 
+        self.placeholder = QtWidgets.QLabel("Загрузите файл с данными")
+        self.placeholder.setAlignment(Qt.AlignCenter)
+        self.widget.layout().addWidget(self.placeholder)
+
+        # Панель дополнительных параметров
+        self.options_dock = QtWidgets.QDockWidget("Дополнительно", self)
+        self.options_dock.setObjectName("options_dock")
+        options = QtWidgets.QWidget()
+        self.options_layout = QtWidgets.QFormLayout(options)
+        self.options_dock.setWidget(options)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.options_dock)
+
+        self.float32_check = QtWidgets.QCheckBox("float32 (вдвое меньше памяти)")
+        self.options_layout.addRow("Загрузка:", self.float32_check)
+
+        self.masses = None
+        self.masses_button = QtWidgets.QPushButton("Массы атомов...")
+        self.masses_button.clicked.connect(self.load_masses)
+        self.options_layout.addRow("VDOS:", self.masses_button)
+
+        self.method_combo = QtWidgets.QComboBox()
+        self.method_combo.addItems(METHODS)
+        self.options_layout.addRow("Метод:", self.method_combo)
+        self.segment_spin = QtWidgets.QSpinBox()
+        self.segment_spin.setRange(16, 1 << 24)
+        self.segment_spin.setValue(4096)
+        self.options_layout.addRow("Сегмент (точек):", self.segment_spin)
+        self.overlap_spin = QtWidgets.QSpinBox()
+        self.overlap_spin.setRange(0, 90)
+        self.overlap_spin.setValue(50)
+        self.overlap_spin.setSuffix(" %")
+        self.options_layout.addRow("Перекрытие:", self.overlap_spin)
+        self.zoom_points_spin = QtWidgets.QSpinBox()
+        self.zoom_points_spin.setRange(16, 1 << 20)
+        self.zoom_points_spin.setValue(4096)
+        self.options_layout.addRow("Точек (зум-FFT):", self.zoom_points_spin)
+        self.nw_spin = QtWidgets.QDoubleSpinBox()
+        self.nw_spin.setRange(1, 50)
+        self.nw_spin.setSingleStep(0.5)
+        self.nw_spin.setValue(4)
+        self.nw_spin.setToolTip("Полуширина полосы в бинах: больше — глаже, но шире пики")
+        self.options_layout.addRow("NW (мультитапер):", self.nw_spin)
+        self.n_tapers_spin = QtWidgets.QSpinBox()
+        self.n_tapers_spin.setRange(0, 100)
+        self.n_tapers_spin.setSpecialValueText("2NW − 1")
+        self.options_layout.addRow("Тапер:", self.n_tapers_spin)
+        self.adaptive_check = QtWidgets.QCheckBox("Адаптивные веса")
+        self.adaptive_check.setChecked(True)
+        self.options_layout.addRow("", self.adaptive_check)
+
+        self.cmap_combo = QtWidgets.QComboBox()
+        self.cmap_combo.addItems(["viridis", "magma", "inferno", "plasma", "jet", "gray"])
+        self.options_layout.addRow("Цветовая карта:", self.cmap_combo)
+        self.time_min_spin = QtWidgets.QDoubleSpinBox()
+        self.time_max_spin = QtWidgets.QDoubleSpinBox()
+        for spin in (self.time_min_spin, self.time_max_spin):
+            spin.setRange(0, 1e9)
+            spin.setDecimals(3)
+            spin.setSuffix(" пс")
+        self.options_layout.addRow("Время от:", self.time_min_spin)
+        self.options_layout.addRow("до:", self.time_max_spin)
+
+        # Сохранение в фоне: график и данные пишутся в отдельном потоке
+        self.line_mode_combo = QtWidgets.QComboBox()
+        self.line_mode_combo.addItems(LINE_MODE_LABELS)
+        self.options_layout.addRow("Линия в PDF/SVG:", self.line_mode_combo)
+        self.save_data_button = QtWidgets.QPushButton("Сохранить данные...")
+        self.save_data_button.clicked.connect(self.save_data)
+        self.options_layout.addRow("Спектр:", self.save_data_button)
+        # Очередь без отмены: каждое сохранение выполняется и сообщает о себе
+        self.export_jobs = TaskQueue(self)
+        self.export_jobs.finished.connect(self.statusBar().showMessage)
+        self.export_jobs.failed.connect(
+            lambda message: self.statusBar().showMessage(f"Ошибка: {message}"))
+
+        # Поиск пиков и подгонка формы линий в диапазоне частот графика
+        self.peaks_check = QtWidgets.QCheckBox("Найти и аппроксимировать")
+        self.options_layout.addRow("Пики:", self.peaks_check)
+        self.peak_shape_combo = QtWidgets.QComboBox()
+        self.peak_shape_combo.addItems(PEAK_SHAPE_LABELS)
+        self.options_layout.addRow("Форма линии:", self.peak_shape_combo)
+        self.prominence_spin = QtWidgets.QDoubleSpinBox()
+        self.prominence_spin.setRange(0.001, 1)
+        self.prominence_spin.setDecimals(3)
+        self.prominence_spin.setSingleStep(0.01)
+        self.prominence_spin.setValue(0.05)
+        self.prominence_spin.setToolTip("Доля максимума спектра в диапазоне")
+        self.options_layout.addRow("Мин. выступание:", self.prominence_spin)
+        self.save_peaks_button = QtWidgets.QPushButton("Сохранить пики...")
+        self.save_peaks_button.clicked.connect(self.save_peaks)
+        self.options_layout.addRow("", self.save_peaks_button)
+
+        self.peaks_dock = QtWidgets.QDockWidget("Пики", self)
+        self.peaks_dock.setObjectName("peaks_dock")
+        self.peaks_table = QtWidgets.QTableWidget(0, len(PEAK_TABLE_COLUMNS))
+        self.peaks_table.setHorizontalHeaderLabels(PEAK_TABLE_COLUMNS)
+        self.peaks_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.peaks_dock.setWidget(self.peaks_table)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.peaks_dock)
+        self.peaks_dock.hide()
+
+        self.follow_check = QtWidgets.QCheckBox("Следить за файлом (Уэлч)")
+        self.follow_check.toggled.connect(self.toggle_follow)
+        self.options_layout.addRow("Слежение:", self.follow_check)
+
+        # Режим слежения за растущим файлом
+        self.file_path = None
+        self.live = None
+        self.live_key = None
+        self.follow_timer = QTimer(self)
+        self.follow_timer.setInterval(1000)
+        self.follow_timer.timeout.connect(self.follow_tick)
+        self.follow_jobs = JobRunner(self)
+        self.follow_jobs.finished.connect(self.on_follow_ready)
+        self.follow_jobs.failed.connect(self.on_spectrum_failed)
+
+        # Кэш результатов на диске: повторный расчёт того же файла с теми же
+        # параметрами читается из кэша; 0 — не сохранять новые результаты
+        self.result_cache = None
+        self.cache_size_spin = QtWidgets.QSpinBox()
+        self.cache_size_spin.setRange(0, 100000)
+        self.cache_size_spin.setSingleStep(256)
+        self.cache_size_spin.setValue(1024)
+        self.cache_size_spin.setSuffix(" МБ")
+        # Размер применяется по завершении ввода, а не на каждой набранной цифре
+        self.cache_size_spin.setKeyboardTracking(False)
+        self.cache_size_spin.valueChanged.connect(self.resize_result_cache)
+        self.options_layout.addRow("Кэш результатов:", self.cache_size_spin)
+
+        self.trace_memory_check = QtWidgets.QCheckBox("Учитывать память (медленнее)")
+        self.options_layout.addRow("Замеры:", self.trace_memory_check)
+        self.profile_button = QtWidgets.QPushButton("Профилировать следующий расчёт")
+        self.profile_button.setCheckable(True)
+        self.options_layout.addRow("", self.profile_button)
+        self.run_timer = None
+        self.run_params = None
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        self.cache_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.cache_label)
 
         # Заполнение выпадающих списков
-        self.component_combo.addItems(["x-компонент", "y-компонент", "z-компонент", "Модуль"])
+        self.component_combo.addItems(COMPONENTS)
         self.color_combo.addItems(["blue", "red", "green", "black", "magenta", "purple"])
         self.window_combo.addItems(["None", "Hann", "Hamming", "Blackman"])
         
@@ -55,23 +220,67 @@ class SpectralAnalyzer(QMainWindow, Ui_mainWindow):
         # Подключение сигналов изменений параметров
         self.connect_parameter_signals()
         
+    def init_canvas(self):
+        """Импорт Matplotlib и создание холста с панелью инструментов"""
+        if self.canvas is not None:
+            return
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        layout = self.widget.layout()
+        layout.removeWidget(self.placeholder)
+        self.placeholder.deleteLater()
+        self.toolbar = NavigationToolbar(self.canvas, self)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas)
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+        self.canvas.mpl_connect('resize_event', lambda event: self.update_visible_line())
+
     def connect_parameter_signals(self):
         """Подключает сигналы изменения параметров к обновлению графика"""
-        signals = [
+        # Параметры, от которых зависит сам спектр
+        compute_signals = [
             self.component_combo.currentIndexChanged,
             self.time_step_spin.valueChanged,
+            self.null_points_spin.valueChanged,
+            self.window_combo.currentIndexChanged,
+            self.method_combo.currentIndexChanged,
+            self.segment_spin.valueChanged,
+            self.overlap_spin.valueChanged,
+            self.zoom_points_spin.valueChanged,
+            self.nw_spin.valueChanged,
+            self.n_tapers_spin.valueChanged,
+            self.adaptive_check.toggled,
+        ]
+        # Параметры оформления: перерисовка без пересчёта
+        view_signals = [
             self.freq_min_spin.valueChanged,
             self.freq_max_spin.valueChanged,
             self.color_combo.currentIndexChanged,
-            self.null_points_spin.valueChanged,
-            self.window_combo.currentIndexChanged,
             self.xlabel_input.textChanged,
             self.ylabel_input.textChanged,
-            self.dpi_spin.textChanged
+            self.cmap_combo.currentIndexChanged,
+            self.time_min_spin.valueChanged,
+            self.time_max_spin.valueChanged,
         ]
-        
-        for signal in signals:
+
+        for signal in compute_signals:
             signal.connect(self.schedule_plot_update)
+        for signal in view_signals:
+            signal.connect(lambda *args: self.render_view())
+        # В режиме зум-FFT пределы частот задают сам расчёт
+        for spin in (self.freq_min_spin, self.freq_max_spin):
+            spin.valueChanged.connect(self.schedule_zoom_update)
+        # Пики ищутся по спектру из кэша, без пересчёта FFT
+        self.peaks_check.toggled.connect(self.schedule_plot_update)
+        for signal in (self.peak_shape_combo.currentIndexChanged,
+                       self.prominence_spin.valueChanged,
+                       self.freq_min_spin.valueChanged,
+                       self.freq_max_spin.valueChanged):
+            signal.connect(self.schedule_peak_update)
 
     def schedule_plot_update(self):
         """Запланировать обновление графика с небольшой задержкой"""
@@ -84,123 +293,560 @@ class SpectralAnalyzer(QMainWindow, Ui_mainWindow):
         
         self.update_timer.start(300)  # 300 мс задержка
 
+    def schedule_zoom_update(self):
+        if self.method_combo.currentText() == ZOOM:
+            self.schedule_plot_update()
+
+    def schedule_peak_update(self):
+        if self.peaks_check.isChecked():
+            self.schedule_plot_update()
+
     def toggle_autocorrelation(self, checked):
         self.autocorr_enabled = checked
         self.autocorr_button.setText("ВКЛ" if checked else "ВЫКЛ")
         self.schedule_plot_update()
 
-    def compute_autocorrelation(self, signal):
-        autocorr = correlate(signal, signal, mode='same')
-        return autocorr[len(autocorr)//4 : 3*len(autocorr)//4]
-
     def load_data(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Выберите файл с данными", "", 
             "Текстовые файлы (*.txt *.dat);;Все файлы (*)"
         )
         if file_path:
+            from loader import load_trajectory
+            from pipeline import file_stamp
+            from result_cache import ResultCache
+
+            dtype = "float32" if self.float32_check.isChecked() else "float64"
+            self.file_button.setEnabled(False)
             try:
-                self.data = np.loadtxt(file_path)
-                if self.data.ndim == 1:
-                    self.data = self.data.reshape(-1, 1)
-                
-                if self.data.shape[1] == 4:
-                    time_step = self.time_step_spin.value()
-                    time = np.arange(0, len(self.data) * time_step, time_step)
-                    self.data = np.column_stack((time, self.data))
-                
-                self.statusBar().showMessage(f"Загружено {len(self.data)} точек")
+                timer = StageTimer(self.trace_memory_check.isChecked())
+                # Снимок до чтения: изменённый во время загрузки файл не
+                # попадёт в кэш результатов под чужим хешем
+                stamp = file_stamp(file_path)
+                with timer.stage("parse"):
+                    data = load_trajectory(file_path, dtype=dtype,
+                                           progress=self.show_load_progress)
+                # Файл, данные и снимок меняются вместе и только после
+                # успешной загрузки, иначе конвейер связал бы данные
+                # одного файла с хешем другого
+                self.data, self.file_path = data, file_path
+                self.data_stamp, self.data_dtype = stamp, dtype
+                log_run("load", {"path": file_path, "dtype": dtype,
+                                 "shape": self.data.shape}, timer)
+                if self.result_cache is None:
+                    self.result_cache = ResultCache()
+                    self.resize_result_cache(self.cache_size_spin.value())
+                self.create_pipeline()
+                self.statusBar().showMessage(
+                    f"Загружено {len(self.data)} точек: {timer.summary()}")
                 self.plot_spectrum()
             except Exception as e:
                 self.statusBar().showMessage(f"Ошибка: {str(e)}")
-                self.data = None
+            finally:
+                self.file_button.setEnabled(True)
+
+    def load_masses(self):
+        """Массы атомов для взвешивания VDOS; пустой выбор сбрасывает массы"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Файл с массами атомов", "",
+            "Текстовые файлы (*.txt *.dat);;Все файлы (*)"
+        )
+        try:
+            from pipeline import load_masses as read_masses
+            self.masses = read_masses(file_path) if file_path else None
+        except Exception as e:
+            self.statusBar().showMessage(f"Ошибка: {str(e)}")
+            return
+        self.masses_button.setText(
+            f"Массы: {len(self.masses)} атомов" if file_path else "Массы атомов...")
+        if self.data is not None:
+            self.create_pipeline()
+            self.schedule_plot_update()
+
+    def create_pipeline(self):
+        """Новый конвейер для текущих данных и масс.
+
+        Конвейер не меняется на месте: отменённое задание может ещё
+        выполняться в фоне и записать в кэш этапов результат по старым
+        данным или массам — оно держит свой, старый экземпляр.
+        """
+        from pipeline import SpectrumPipeline
+
+        self.spectrum_jobs.cancel()
+        self.pipeline = SpectrumPipeline(self.data)
+        self.pipeline.set_masses(self.masses)
+        self.pipeline.set_store(self.result_cache, self.file_path, self.data_dtype,
+                                self.data_stamp)
+
+    def resize_result_cache(self, megabytes):
+        """Новый предел кэша результатов; 0 — не сохранять новые записи"""
+        if self.result_cache is not None:
+            self.result_cache.max_bytes = megabytes * 1024 * 1024
+            self.result_cache.evict()
+
+    def show_load_progress(self, done, total):
+        self.statusBar().showMessage(f"Загрузка: {100 * done // max(total, 1)}%")
+        # Только перерисовка: нажатия и правки параметров во время загрузки
+        # обработаются после неё, когда данные и файл уже согласованы
+        QApplication.processEvents(QEventLoop.ExcludeUserInputEvents)
 
     def plot_spectrum(self):
+        if self.live is not None:
+            # Накопление начинается заново, только если меняется сама
+            # периодограмма; шаг времени, обнуление и пики применяются
+            # к уже накопленной
+            if self.follow_key() != self.live_key:
+                self.start_follow()
+            else:
+                self.follow_tick()
+            return
         if self.data is None:
             self.statusBar().showMessage("Ошибка: данные не загружены")
             return
 
+        # Параметры читаются в GUI-потоке, вычисление идёт в фоне
+        pipeline = self.pipeline
+        params = self.spectrum_params()
+        timer = StageTimer(self.trace_memory_check.isChecked())
+        if params["method"] == SPECTROGRAM:
+            def job(check_cancelled, progress):
+                return pipeline.spectrogram(
+                    params["component"], params["time_step"], params["window"],
+                    params["segment"], params["overlap"],
+                    check_cancelled=check_cancelled, progress=progress, timer=timer)
+        else:
+            peak_params = self.peak_params()
+
+            def job(check_cancelled, progress):
+                freqs, values = pipeline.compute(check_cancelled=check_cancelled,
+                                                 progress=progress, timer=timer, **params)
+                if peak_params is None:
+                    return freqs, values
+                from peaks import analyze_peaks
+                with timer.stage("peaks"):
+                    return freqs, values, analyze_peaks(freqs, values, **peak_params)
+
+        if self.profile_button.isChecked():
+            self.profile_button.setChecked(False)
+            job = profiled(job)
+            self.statusBar().showMessage(f"Профиль будет сохранён в {job.path}")
+        else:
+            self.statusBar().showMessage("Вычисление спектра...")
+        # Результат доставляется только от последнего задания — его замеры и показываются
+        self.run_timer = timer
+        self.run_params = params
+        self.spectrum_jobs.submit(job)
+
+    def spectrum_params(self):
+        return dict(
+            component=self.component_combo.currentIndex(),
+            time_step=self.time_step_spin.value() * 1e-15,
+            window=self.window_combo.currentText(),
+            autocorr=self.autocorr_enabled,
+            null_points=self.null_points_spin.value(),
+            method=self.method_combo.currentText(),
+            segment=self.segment_spin.value(),
+            overlap=self.overlap_spin.value(),
+            freq_min=self.freq_min_spin.value(),
+            freq_max=self.freq_max_spin.value(),
+            zoom_points=self.zoom_points_spin.value(),
+            nw=self.nw_spin.value(),
+            n_tapers=self.n_tapers_spin.value(),
+            adaptive=self.adaptive_check.isChecked(),
+        )
+
+    def peak_params(self):
+        """Параметры поиска пиков или None, если он выключен"""
+        if not self.peaks_check.isChecked():
+            return None
+        from peaks import SHAPES
+
+        return dict(freq_min=self.freq_min_spin.value(),
+                    freq_max=self.freq_max_spin.value(),
+                    shape=SHAPES[self.peak_shape_combo.currentIndex()],
+                    prominence=self.prominence_spin.value())
+
+    def toggle_follow(self, checked):
+        if not checked:
+            self.follow_timer.stop()
+            self.follow_jobs.cancel()
+            self.live = None
+            return
+        if self.file_path is None:
+            self.statusBar().showMessage("Ошибка: файл не выбран")
+            self.follow_check.setChecked(False)
+            return
+        self.start_follow()
+
+    def follow_key(self):
+        """Параметры, от которых зависит накопленная при слежении периодограмма"""
+        params = self.spectrum_params()
+        # Массы сравниваются как объект: load_masses каждый раз создаёт новый
+        return (self.file_path, params["component"], params["window"],
+                params["segment"], params["overlap"], id(self.masses),
+                "float32" if self.float32_check.isChecked() else "float64")
+
+    def start_follow(self):
+        """Новое накопление спектра Уэлча с начала файла"""
+        from pipeline import LiveSpectrum
+
+        self.live_key = self.follow_key()
+        path, component, window, segment, overlap, _, dtype = self.live_key
+        self.live = LiveSpectrum(path, component, window, segment, overlap,
+                                 self.masses, dtype)
+        self.follow_jobs.cancel()
+        self.follow_tick()
+        self.follow_timer.start()
+
+    def follow_tick(self):
+        """Дочитывает файл в фоне; задания выполняются строго по очереди"""
+        live = self.live
+        time_step = self.time_step_spin.value() * 1e-15
+        null_points = self.null_points_spin.value()
+        peak_params = self.peak_params()
+
+        def refresh(check_cancelled, progress):
+            live.refresh()
+            spectrum = live.result(time_step, null_points)
+            if spectrum is None or peak_params is None:
+                return live.n_rows, spectrum, None
+            from peaks import analyze_peaks
+            return live.n_rows, spectrum, analyze_peaks(*spectrum, **peak_params)
+
+        self.follow_jobs.submit(refresh)
+
+    def on_follow_ready(self, result):
+        n_rows, spectrum, fit = result
+        if spectrum is not None:
+            self.show_peaks(fit)
+            self.render_spectrum(*spectrum)
+        self.statusBar().showMessage(f"Слежение: {n_rows} точек")
+        # Уже записанная часть большого файла читается кусками, задание за заданием
+        if self.live is not None and self.live.pending:
+            self.follow_tick()
+
+    def show_progress(self, percent):
+        self.progress_bar.setValue(percent)
+        self.progress_bar.show()
+
+    def on_spectrum_ready(self, result):
+        from pipeline import Spectrogram
+
+        self.progress_bar.hide()
+        timer = self.run_timer
         try:
-            component_idx = self.component_combo.currentIndex()
-            time_step = self.time_step_spin.value() * 1e-15
-            color = self.color_combo.currentText()
-            window_type = self.window_combo.currentText()
-
-            signal = self.data[:, component_idx + 1].copy()
-            signal -= np.mean(signal)
-
-            if window_type != "None":
-             if window_type == "Hann":
-                window = np.hanning(len(signal))
-             elif window_type == "Hamming":
-                window = np.hamming(len(signal))
-             elif window_type == "Blackman":
-                window = np.blackman(len(signal))
-             signal *= window
-
-            if self.autocorr_enabled:
-                signal = self.compute_autocorrelation(signal)
-
-            N = len(signal)
-            fft_vals = np.abs(fft(signal)[:N//2])
-            fft_vals = fft_vals / np.max(fft_vals)
-            freqs = fftfreq(N, time_step)[:N//2] / 2.99792458e10  # Переводим в см⁻¹
-            
-            null_count = self.null_points_spin.value()
-            if null_count > 0:
-                fft_vals = fft_vals.copy()  # Создаём копию для безопасности
-                fft_vals[:null_count] = 0
-            
-            # Отладочный вывод
-            print("Данные FFT:", fft_vals[:10])
-            print("Частоты:", freqs[:10])
+            with timer.stage("draw"):
+                if isinstance(result, Spectrogram):
+                    self.render_spectrogram(result, sync=True)
+                    message = "Спектрограмма построена"
+                else:
+                    self.show_peaks(result[2] if len(result) > 2 else None)
+                    self.render_spectrum(result[0], result[1], sync=True)
+                    message = "График построен"
+        except Exception as e:
+            self.on_spectrum_failed(str(e))
+            return
+        if timer.has("fft") or timer.has("stft"):
+            self.cache_label.setText("Результат: рассчитан")
+        elif timer.has("cache"):
+            self.cache_label.setText("Результат: из кэша на диске")
+        else:
+            self.cache_label.setText("Результат: из памяти")
+        log_run("spectrum", self.run_params, timer)
+        self.statusBar().showMessage(f"{message}: {timer.summary()}")
 
-            self.figure.clear()
-            ax = self.figure.add_subplot(111)
-            ax.plot(freqs, fft_vals, color=color)
-            
-            # Настройка осей
-            ax.set_title(f"Спектр {'(автокорр.)' if self.autocorr_enabled else ''}")
-            ax.set_xlabel(self.xlabel_input.text())
-            ax.set_ylabel(self.ylabel_input.text())
-            ax.grid(True)
+    def on_spectrum_failed(self, message):
+        self.progress_bar.hide()
+        self.statusBar().showMessage(f"Ошибка построения: {message}")
+        log_error("spectrum", self.run_params, message)
 
-            # Установка пределов, если заданы
+    def show_peaks(self, fit):
+        """Таблица пиков; отметки на графике появляются при отрисовке спектра"""
+        self.peak_fit = fit
+        self.peaks_dock.setVisible(fit is not None)
+        if fit is None:
+            return
+        self.peaks_table.setRowCount(len(fit.position))
+        for row, values in enumerate(zip(fit.position, fit.amplitude, fit.width,
+                                         fit.area)):
+            for column, value in enumerate(values):
+                self.peaks_table.setItem(row, column,
+                                         QtWidgets.QTableWidgetItem(f"{value:.4g}"))
+
+    def draw_peaks(self):
+        """Заменяет отметки пиков на осях; True, если они изменились"""
+        if self.peak_fit is self.drawn_peak_fit:
+            return False
+        from plotting import annotate_peaks
+
+        for artist in self.peak_artists:
+            artist.remove()
+        self.peak_artists = []
+        if self.peak_fit is not None:
+            # Подогнанный спектр — по диапазону поиска пиков
             freq_min = self.freq_min_spin.value()
             freq_max = self.freq_max_spin.value()
-            if freq_min < freq_max:
-                ax.set_xlim(freq_min, freq_max)
-            
+            band = (freq_min, freq_max) if freq_min < freq_max else self.full_xlim
+            self.peak_artists = annotate_peaks(self.ax, self.peak_fit, *band)
+        self.drawn_peak_fit = self.peak_fit
+        return True
+
+    def render_spectrum(self, freqs=None, values=None, sync=False):
+        """Обновляет линию и оси на месте, без очистки фигуры.
+
+        Линия анимированная: если изменились только данные или цвет, а оси
+        остались прежними, она перерисовывается поверх сохранённого фона
+        (blit) без полной отрисовки фигуры. При sync фигура рисуется сразу,
+        а не в следующем цикле событий, — так время отрисовки можно замерить.
+        """
+        from plotting import minmax_decimate
+
+        if self.line is None:
+            if freqs is None:
+                return
+            self.init_canvas()
+            self.figure.clear()
+            self.image = None
+            self.ax = self.figure.add_subplot(111)
+            self.line, = self.ax.plot([], [], animated=True)
+            self.peak_artists = []
+            self.drawn_peak_fit = None
+            self.ax.grid(True)
+            self.ax.callbacks.connect('xlim_changed', lambda ax: self.update_visible_line())
+
+        ax = self.ax
+        view_before = self.view_state()
+        if freqs is not None:
+            self.spectrum = (freqs, values)
+            # Пределы по всему спектру; min/max-прореживание сохраняет экстремумы
+            self.line.set_data(*minmax_decimate(
+                freqs, values, freqs[0], freqs[-1], self.line_bins()))
+            ax.relim()
+            ax.set_autoscale_on(True)
+            ax.autoscale_view()
+            self.full_xlim = ax.get_xlim()
+
+        self.line.set_color(self.color_combo.currentText())
+        if self.method_combo.currentText() == WELCH:
+            ax.set_title("Спектр (Уэлч)")
+        elif self.method_combo.currentText() == MULTITAPER:
+            ax.set_title("Спектр (мультитапер)")
+        elif self.method_combo.currentText() == ZOOM:
+            ax.set_title(f"Спектр (зум-FFT{', автокорр.' if self.autocorr_enabled else ''})")
+        else:
+            ax.set_title(f"Спектр {'(автокорр.)' if self.autocorr_enabled else ''}")
+        ax.set_xlabel(self.xlabel_input.text())
+        ax.set_ylabel(self.ylabel_input.text())
+
+        # Установка пределов, если заданы
+        freq_min = self.freq_min_spin.value()
+        freq_max = self.freq_max_spin.value()
+        if freq_min < freq_max:
+            ax.set_xlim(freq_min, freq_max)
+        else:
+            ax.set_xlim(self.full_xlim)
+        self.update_visible_line()
+
+        # Отметки пиков не анимированы и входят в фон: при их смене нужна полная отрисовка
+        if not self.draw_peaks() and self.view_state() == view_before:
+            self.blit_line()
+        else:
+            self.redraw(sync)
+
+    def render_view(self):
+        """Перерисовка после изменения оформления"""
+        if self.image is not None:
+            self.render_spectrogram()
+        else:
+            self.render_spectrum()
+
+    def redraw(self, sync=False):
+        if sync:
             self.canvas.draw()
-            self.statusBar().showMessage("График построен")
-        
-        except Exception as e:
-            self.statusBar().showMessage(f"Ошибка построения: {str(e)}")
-            print("Ошибка в plot_spectrum:", str(e))
+        else:
+            self.canvas.draw_idle()
+
+    def render_spectrogram(self, result=None, sync=False):
+        """Спектрограмма: время по x, частота по y, мощность цветом (дБ).
+
+        Кадры не пересчитываются при смене карты, частотных и временных
+        пределов — меняется только изображение на осях.
+        """
+        if self.image is None:
+            if result is None:
+                return
+            self.init_canvas()
+            self.figure.clear()
+            self.line = None
+            self.spectrum = None
+            self.background = None
+            self.peak_artists = []
+            self.drawn_peak_fit = None
+            self.ax = self.figure.add_subplot(111)
+            self.image = self.ax.imshow(
+                [[0.0]], origin='lower', aspect='auto',
+                interpolation='nearest', vmin=-60, vmax=0)
+            self.figure.colorbar(self.image, ax=self.ax, label="дБ")
+
+        ax = self.ax
+        if result is not None:
+            times, freqs, power_db = result
+            dt = times[1] - times[0] if len(times) > 1 else 1
+            self.image.set_data(power_db.T)
+            self.image.set_extent((times[0] - dt / 2, times[-1] + dt / 2,
+                                   freqs[0], freqs[-1]))
+            self.spectrogram_extent = self.image.get_extent()
+
+        x_min, x_max, y_min, y_max = self.spectrogram_extent
+        self.image.set_cmap(self.cmap_combo.currentText())
+        ax.set_title("Спектрограмма")
+        ax.set_xlabel("Время (пс)")
+        ax.set_ylabel(self.xlabel_input.text())
+
+        freq_min = self.freq_min_spin.value()
+        freq_max = self.freq_max_spin.value()
+        ax.set_ylim(*((freq_min, freq_max) if freq_min < freq_max else (y_min, y_max)))
+        time_min = self.time_min_spin.value()
+        time_max = self.time_max_spin.value()
+        ax.set_xlim(*((time_min, time_max) if time_min < time_max else (x_min, x_max)))
+        self.redraw(sync)
+
+    def view_state(self):
+        """Всё, кроме линии, что видно на осях"""
+        ax = self.ax
+        return (ax.get_xlim(), ax.get_ylim(), ax.get_title(),
+                ax.get_xlabel(), ax.get_ylabel(), self.figure.bbox.bounds)
+
+    def line_bins(self):
+        """Число корзин прореживания — ширина осей в пикселях"""
+        return max(int(self.ax.bbox.width), 100)
+
+    def update_visible_line(self):
+        """Оставляет на линии только видимый диапазон, прореженный по ширине осей.
+
+        Вызывается при любом изменении пределов по x, в том числе при
+        панорамировании и масштабировании с панели инструментов.
+        """
+        if self.spectrum is None:
+            return
+        from plotting import minmax_decimate
+
+        x_min, x_max = sorted(self.ax.get_xlim())
+        self.line.set_data(*minmax_decimate(
+            *self.spectrum, x_min, x_max, self.line_bins()))
+
+    def on_canvas_draw(self, event):
+        """После полной отрисовки запоминает фон и дорисовывает линию.
+
+        При сохранении рисунка кнопкой панели событие приходит от другого
+        холста (SVG, PDF) или от этого же во время сохранения: фон тогда
+        не запоминается, а анимированная линия рисуется прямо в файл.
+        """
+        if self.line is None:
+            return
+        if event.canvas is not self.canvas or event.canvas.is_saving():
+            self.line.draw(event.renderer)
+            return
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.ax.draw_artist(self.line)
+
+    def blit_line(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.figure.bbox)
 
     def save_plot(self):
-        if not hasattr(self, 'figure') or not self.figure.axes:
+        """Сохраняет график в фоне; оформление и пределы — как на экране"""
+        if self.figure is None or not self.figure.axes:
             return
 
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Сохранить график", "",
             "PNG (*.png);;JPEG (*.jpg);;PDF (*.pdf);;SVG (*.svg)")
-        # print(file_path)
+        if not file_path:
+            return
+        from export import LINE_MODES, save_spectrum_plot, spectrogram_figure
+
         mydpi = int(self.dpi_spin.value())
-        # print(mydpi)
+        ax = self.ax
+        if self.image is not None:
+            power_db = self.image.get_array()
+            extent = self.image.get_extent()
+            style = dict(cmap=self.cmap_combo.currentText(), title=ax.get_title(),
+                         xlabel=ax.get_xlabel(), ylabel=ax.get_ylabel(),
+                         xlim=ax.get_xlim(), ylim=ax.get_ylim())
 
-        if file_path:
-            try:
-                # mydpi = int(self.dpi_spin.value())
-                # print(mydpi)
-                self.figure.savefig(file_path, dpi=int(mydpi), bbox_inches='tight')
-                self.statusBar().showMessage(f"Сохранено (DPI: {mydpi})")
-            except Exception as e:
-                self.statusBar().showMessage(f"Ошибка: {str(e)}")
+            def save():
+                spectrogram_figure(power_db, extent, **style).savefig(
+                    file_path, dpi=mydpi, bbox_inches='tight')
+        else:
+            freqs, values = self.spectrum
+            freq_min, freq_max = ax.get_xlim()
+            line_mode = LINE_MODES[self.line_mode_combo.currentIndex()]
+            style = dict(color=self.color_combo.currentText(), title=ax.get_title(),
+                         xlabel=ax.get_xlabel(), ylabel=ax.get_ylabel(),
+                         freq_min=freq_min, freq_max=freq_max, ylim=ax.get_ylim(),
+                         peaks=self.peak_fit)
+
+            def save():
+                save_spectrum_plot(file_path, freqs, values, mydpi, line_mode, **style)
+
+        def job(check_cancelled, progress):
+            save()
+            return f"Сохранено (DPI: {mydpi}): {file_path}"
+
+        self.statusBar().showMessage("Сохранение графика...")
+        self.export_jobs.submit(job)
+
+    def save_data(self):
+        """Сохраняет спектр в полном разрешении (не прорежённую линию) в фоне"""
+        if self.spectrum is None:
+            self.statusBar().showMessage("Ошибка: нет спектра для сохранения")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить данные спектра", "",
+            "CSV (*.csv);;NumPy (*.npy);;NumPy архив (*.npz);;HDF5 (*.h5)")
+        if not file_path:
+            return
+        from export import write_spectrum
+
+        freqs, values = self.spectrum
+
+        def job(check_cancelled, progress):
+            write_spectrum(file_path, freqs, values)
+            return f"Данные сохранены ({len(freqs)} точек): {file_path}"
+
+        self.statusBar().showMessage("Сохранение данных...")
+        self.export_jobs.submit(job)
+
+    def save_peaks(self):
+        """Сохраняет таблицу пиков последнего расчёта в CSV"""
+        if self.peak_fit is None:
+            self.statusBar().showMessage("Ошибка: пики не найдены (включите поиск пиков)")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить пики", "", "CSV (*.csv)")
+        if not file_path:
+            return
+        from export import write_peaks
+
+        write_peaks(file_path, [(os.path.basename(self.file_path or ""), self.peak_fit)])
+        self.statusBar().showMessage(
+            f"Пики сохранены ({len(self.peak_fit.position)}): {file_path}")
 
+    def closeEvent(self, event):
+        # Начатые сохранения дописываются до конца, а не обрываются на выходе
+        self.export_jobs.wait()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = SpectralAnalyzer()
     window.show()
+    if "--startup-probe" in sys.argv:
+        # Замер холодного старта (build.py): выход после первой отрисовки окна
+        QTimer.singleShot(0, app.quit)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Форма линии: лоренцева (однородное уширение) или гауссова
+SHAPES = ["lorentz", "gauss"]
+MAX_PEAKS = 50
+FIT_WIDTHS = 3  # полуширин по обе стороны от пика, по которым идёт подгонка
+MAX_FIT_POINTS = 20000  # точек в подгонке; более плотный спектр прореживается
+GAUSS_C = 4 * np.log(2)
+
+# Параметры линий: массивы по пикам (width — полная ширина на полувысоте,
+# area — площадь под линией), baseline — общий постоянный фон
+PeakFit = namedtuple("PeakFit", ["position", "amplitude", "width", "area",
+                                 "shape", "baseline"])
+
+
+def band_slice(freqs, freq_min=0, freq_max=0):
+    """Срез точек спектра в диапазоне freq_min..freq_max (весь спектр, если он не задан)"""
+    if freq_min < freq_max:
+        return slice(np.searchsorted(freqs, freq_min, side="left"),
+                     np.searchsorted(freqs, freq_max, side="right"))
+    return slice(0, len(freqs))
+
+
+def find_band_peaks(freqs, values, freq_min=0, freq_max=0, prominence=0.05,
+                    max_peaks=MAX_PEAKS):
+    """Пики в диапазоне частот: (индексы точек спектра, ширины на полувысоте в см⁻¹).
+
+    prominence — минимальная выступающая высота пика относительно
+    максимума спектра в диапазоне; остаются max_peaks самых выступающих.
+    """
+    from scipy.signal import find_peaks
+
+    band = band_slice(freqs, freq_min, freq_max)
+    segment = values[band]
+    if len(segment) < 3:
+        return np.array([], dtype=int), np.array([])
+    # Спектр мощности неотрицателен, поэтому пик не ниже своей выступающей
+    # высоты: отбор по высоте дешёвый и отсекает шумовые максимумы до
+    # расчёта выступания
+    threshold = prominence * segment.max()
+    found, props = find_peaks(segment, height=threshold, prominence=threshold,
+                              width=0, rel_height=0.5)
+    if len(found) > max_peaks:
+        keep = np.sort(np.argsort(props["prominences"])[-max_peaks:])
+        found = found[keep]
+        props = {name: value[keep] for name, value in props.items()}
+
+    # Границы на полувысоте дробные — переводятся в частоты интерполяцией
+    index = np.arange(len(segment))
+    band_freqs = freqs[band]
+    widths = (np.interp(props["right_ips"], index, band_freqs)
+              - np.interp(props["left_ips"], index, band_freqs))
+    return found + band.start, widths
+
+
+def _fit_points(freqs, positions, widths):
+    """Маска точек, лежащих не дальше FIT_WIDTHS полуширин от какого-либо пика"""
+    reach = FIT_WIDTHS * np.maximum(widths, freqs[1] - freqs[0])
+    starts = np.searchsorted(freqs, positions - reach)
+    stops = np.searchsorted(freqs, positions + reach)
+    # Объединение отрезков: +1 в начале, −1 после конца, затем накопленная сумма
+    cover = np.zeros(len(freqs) + 1, dtype=int)
+    np.add.at(cover, starts, 1)
+    np.add.at(cover, stops, -1)
+    mask = np.cumsum(cover[:-1]) > 0
+    points = np.flatnonzero(mask)
+    if len(points) > MAX_FIT_POINTS:
+        points = points[::-(-len(points) // MAX_FIT_POINTS)]
+    return points
+
+
+def _lines(x, position, amplitude, width, shape):
+    """Линии всех пиков на точках x: матрица (точки, пики) и производные по параметрам"""
+    dx = x[:, None] - position
+    if shape == "lorentz":
+        half2 = (width / 2) ** 2
+        denom = dx ** 2 + half2
+        profile = half2 / denom
+        lines = amplitude * profile
+        d_position = lines * 2 * dx / denom
+        d_width = amplitude * dx ** 2 / denom ** 2 * width / 2
+    else:
+        profile = np.exp(-GAUSS_C * dx ** 2 / width ** 2)
+        lines = amplitude * profile
+        d_position = lines * 2 * GAUSS_C * dx / width ** 2
+        d_width = lines * 2 * GAUSS_C * dx ** 2 / width ** 3
+    return lines, profile, d_position, d_width
+
+
+def fit_peaks(freqs, values, peaks, widths, shape="lorentz"):
+    """Подгонка всех пиков одной задачей наименьших квадратов.
+
+    Модель — сумма линий формы shape и постоянный фон; параметры всех
+    пиков (положение, высота, ширина) уточняются совместно, так что
+    перекрывающиеся пики делят интенсивность между собой. Якобиан
+    считается аналитически для всех пиков сразу. Положение пика
+    ограничено его полушириной около найденного максимума.
+    """
+    from scipy.optimize import least_squares
+
+    if shape not in SHAPES:
+        raise ValueError(f"неизвестная форма линии: {shape}")
+    n = len(peaks)
+    if n == 0:
+        empty = np.array([])
+        return PeakFit(empty, empty, empty, empty, shape, 0.0)
+
+    step = freqs[1] - freqs[0]
+    position0 = freqs[peaks]
+    width0 = np.maximum(widths, 2 * step)
+    points = _fit_points(freqs, position0, width0)
+    x, y = freqs[points], values[points]
+    baseline0 = min(float(y.min()), 0.0)
+    amplitude0 = np.maximum(values[peaks] - baseline0, 1e-12)
+
+    def unpack(p):
+        return p[:n], p[n:2 * n], p[2 * n:3 * n], p[-1]
+
+    def residuals(p):
+        position, amplitude, width, baseline = unpack(p)
+        lines = _lines(x, position, amplitude, width, shape)[0]
+        return lines.sum(axis=1) + baseline - y
+
+    def jacobian(p):
+        _, profile, d_position, d_width = _lines(x, *unpack(p)[:3], shape)
+        return np.hstack((d_position, profile, d_width, np.ones((len(x), 1))))
+
+    p0 = np.concatenate((position0, amplitude0, width0, [baseline0]))
+    lower = np.concatenate((position0 - width0 / 2, np.zeros(n),
+                            np.full(n, step), [-np.inf]))
+    upper = np.concatenate((position0 + width0 / 2, np.full(n, np.inf),
+                            np.full(n, max(x[-1] - x[0], 4 * step)), [np.inf]))
+    result = least_squares(residuals, np.clip(p0, lower, upper), jac=jacobian,
+                           bounds=(lower, upper), x_scale="jac")
+
+    position, amplitude, width, baseline = unpack(result.x)
+    if shape == "lorentz":
+        area = np.pi * amplitude * width / 2
+    else:
+        area = amplitude * width * np.sqrt(np.pi / GAUSS_C)
+    order = np.argsort(position)
+    return PeakFit(position[order], amplitude[order], width[order], area[order],
+                   shape, float(baseline))
+
+
+def analyze_peaks(freqs, values, freq_min=0, freq_max=0, shape="lorentz",
+                  prominence=0.05, max_peaks=MAX_PEAKS):
+    """Поиск пиков в диапазоне частот и подгонка их формы"""
+    peaks, widths = find_band_peaks(freqs, values, freq_min, freq_max,
+                                    prominence, max_peaks)
+    return fit_peaks(freqs, values, peaks, widths, shape)
+
+
+def peak_model(x, fit):
+    """Подогнанный спектр (сумма линий и фон) на частотах x"""
+    lines = _lines(x, fit.position, fit.amplitude, fit.width, fit.shape)[0]
+    return lines.sum(axis=1) + fit.baseline
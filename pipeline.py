@@ -0,0 +1,485 @@
+import os
+import time
+import hashlib
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+
+from choices import MODULUS, MULTITAPER, SUM_XYZ, VDOS, WELCH, ZOOM
+from loader import TailReader, file_digest
+from spectrum import (BLOCK_MEMORY, WINDOWS, WelchAccumulator, amplitude_spectrum, dpss_tapers,
+                      multitaper_power, stft_power, total_autocorrelation, vdos,
+                      wavenumbers, zoom_spectrum, zoom_transform, zoom_wavenumbers)
+
+Spectrogram = namedtuple("Spectrogram", "times freqs power_db")
+WELCH_ROWS = 1 << 18  # наибольшее число строк за одно чтение в методе Уэлча
+TAPER_CACHE_SHARE = 8  # тапера пишутся на диск, если занимают до 1/8 кэша результатов
+
+
+def apply_window(signals, window_type):
+    """Умножает столбцы на оконную функцию (без копии, если окно не задано)"""
+    if window_type not in WINDOWS:
+        return signals
+    return signals * WINDOWS[window_type](len(signals))[:, None]
+
+
+def column_layout(n_columns):
+    """Первый столбец скоростей и число атомов по числу столбцов файла.
+
+    4 столбца — x, y, z, модуль одной частицы; 5 — то же со временем;
+    3N или 3N + 1 (время первым) — скорости N атомов подряд: x₁ y₁ z₁ x₂ ...
+    """
+    if n_columns == 4:
+        return 0, 1
+    if n_columns == 5:
+        return 1, 1
+    if n_columns % 3 == 0:
+        return 0, n_columns // 3
+    if n_columns % 3 == 1:
+        return 1, n_columns // 3
+    return 1, 0
+
+
+def load_masses(path):
+    """Массы атомов из текстового файла (по одной или через пробел)"""
+    return np.loadtxt(path, ndmin=1).ravel()
+
+
+def select_columns(component, n_columns, masses=None):
+    """Номера столбцов выбранной компоненты и их веса (None — равные).
+
+    n_columns — число столбцов файла (см. column_layout). Столбец модуля
+    есть только в файлах одной частицы из 4 или 5 столбцов.
+    """
+    first_column, n_atoms = column_layout(n_columns)
+    if component == MODULUS and n_columns not in (4, 5):
+        raise ValueError("модуль есть только в файлах из 4 или 5 столбцов "
+                         "(x, y, z, модуль)")
+    if component == VDOS:
+        if n_atoms == 0:
+            raise ValueError("в файле нет скоростей атомов (3N столбцов)")
+        weights = None
+        if masses is not None:
+            if len(masses) != n_atoms:
+                raise ValueError(f"масс: {len(masses)}, атомов: {n_atoms}")
+            weights = np.repeat(masses, 3)
+        return np.arange(first_column, first_column + 3 * n_atoms), weights
+    if component == SUM_XYZ:
+        return np.arange(first_column, first_column + 3), None
+    return np.array([first_column + component]), None
+
+
+def file_stamp(path):
+    """Размер и время изменения файла: по ним видно, что файл переписан"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def welch_values(component, power):
+    """Спектр Уэлча для показа.
+
+    Как и в FFT-режиме: для компонент показывается амплитуда, для VDOS — мощность.
+    """
+    return power if component == VDOS else np.sqrt(power)
+
+
+def normalize(values):
+    return values / np.max(values)
+
+
+def spectrum_key(component, time_step, window, autocorr, method, segment, overlap,
+                 band=None, multitaper=None):
+    """Параметры, от которых зависит спектр до нормировки и обнуления"""
+    if method == ZOOM:
+        return (component, window, autocorr, method, time_step) + band
+    if method == WELCH:
+        return (component, window, method, segment, overlap)
+    if method == MULTITAPER:
+        return (component, method) + multitaper
+    return (component, window, autocorr)
+
+
+class SpectrumPipeline:
+    """Поэтапное вычисление спектра с кэшированием промежуточных результатов.
+
+    Каждый этап запоминает ключ (параметры, от которых он зависит) и результат.
+    При изменении параметра пересчитываются только этапы, стоящие после него.
+    С дисковым кэшем (set_store) спектры до нормировки и автокорреляции
+    сохраняются между сеансами.
+    """
+
+    def __init__(self, data=None):
+        self.data = None
+        self.first_column = 0
+        self.n_atoms = 0
+        self.masses = None
+        self.store = None
+        self._path = None
+        self._stamp = None
+        self._dtype_name = None
+        self._source = None
+        self._cache = {}
+        self._check_cancelled = None
+        self._progress = None
+        self._timer = None
+        if data is not None:
+            self.set_data(data)
+
+    def set_data(self, data):
+        """Новые данные; дисковый кэш отключается до следующего set_store"""
+        self.data = data
+        self.first_column, self.n_atoms = column_layout(data.shape[1])
+        self.store = None
+        self._cache.clear()
+
+    def set_store(self, store, path, dtype, stamp=None):
+        """Дисковый кэш результатов (ResultCache) для текущих данных.
+
+        path — файл, из которого загружены данные, dtype — тип, в котором
+        он загружен. Хеш содержимого файла (loader.file_digest) вместе
+        с dtype и параметрами расчёта образует ключ записи; он считается
+        при первом обращении к кэшу, то есть в потоке расчёта, а не при
+        загрузке. stamp — file_stamp(path), снятый до загрузки (по умолчанию
+        снимается сейчас); если файл с тех пор изменился, кэш не используется.
+        """
+        self.store = store
+        self._path = path
+        self._stamp = file_stamp(path) if stamp is None else stamp
+        self._dtype_name = np.dtype(dtype).name
+        self._source = None
+
+    def _data_source(self):
+        """(хеш файла, тип данных) или None, если файл уже не тот, что загружен"""
+        if self._source is None:
+            if file_stamp(self._path) != self._stamp:
+                self._source = ()
+            else:
+                digest = self._timed("hash", lambda: file_digest(self._path))
+                self._source = (digest, self._dtype_name)
+        return self._source or None
+
+    def set_masses(self, masses):
+        """Массы атомов для VDOS; None — все массы равны"""
+        self.masses = masses
+        for stage in ("fft", "raw", "normalize", "null", "stft"):
+            self._cache.pop(stage, None)
+
+    def _stage(self, name, key, func):
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        if self._check_cancelled is not None:
+            self._check_cancelled()
+        value = self._timed(name, func)
+        self._cache[name] = (key, value)
+        return value
+
+    def _remembered(self, name, key, func):
+        """Как _stage, но без замера: func сама состоит из замеряемых этапов"""
+        cached = self._cache.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, func())
+            self._cache[name] = cached
+        return cached[1]
+
+    def _timed(self, name, func):
+        if self._timer is None:
+            return func()
+        with self._timer.stage(name):
+            return func()
+
+    def _stored(self, kind, key, func, shared=False):
+        """Словарь массивов из дискового кэша или результат func() с записью в кэш.
+
+        shared — запись не зависит от данных и общая для всех файлов.
+        """
+        if self.store is None:
+            return func()
+        if shared:
+            store_key = (kind,) + key
+        else:
+            source = self._data_source()
+            if source is None:
+                return func()
+            store_key = (kind,) + source + key
+        if not shared and key[0] == VDOS and self.masses is not None:
+            masses = np.ascontiguousarray(self.masses, dtype=float)
+            store_key += (hashlib.sha1(masses.tobytes()).hexdigest(),)
+
+        start = time.perf_counter()
+        arrays = self.store.get(store_key)
+        if arrays is not None:
+            if self._timer is not None:
+                self._timer.record("cache", time.perf_counter() - start)
+            return arrays
+        arrays = func()
+        self._timed("store", lambda: self.store.put(store_key, **arrays))
+        return arrays
+
+    def _columns(self, component):
+        return select_columns(component, self.data.shape[1], self.masses)
+
+    def _extract(self, component):
+        """Столбцы (N, k) выбранной компоненты без среднего"""
+        columns, _ = self._columns(component)
+        signals = np.array(self.data[:, columns[0]:columns[-1] + 1], dtype=float)
+        signals -= signals.mean(axis=0)
+        return signals
+
+    def compute(self, component, time_step, window, autocorr, null_points,
+                method="FFT", segment=4096, overlap=50,
+                freq_min=0, freq_max=0, zoom_points=4096,
+                nw=4, n_tapers=0, adaptive=True,
+                check_cancelled=None, progress=None, timer=None):
+        """Возвращает частоты (см⁻¹) и нормированный спектр.
+
+        method "Уэлч" — усреднение по сегментам длины segment с перекрытием
+        overlap процентов; автокорреляция при этом не применяется.
+        method "Зум-FFT" — спектр только на zoom_points частотах от freq_min
+        до freq_max см⁻¹ (chirp-z преобразование).
+        method "Мультитапер" — среднее спектров с n_tapers таперами DPSS
+        полуширины nw (0 — 2·nw − 1 тапер), с адаптивными весами при
+        adaptive; окно и автокорреляция при этом не применяются.
+        check_cancelled вызывается перед каждым пересчитываемым этапом
+        и может прервать вычисление исключением (workers.Cancelled);
+        progress(процент) сообщает о ходе долгих этапов. timer (StageTimer)
+        получает время каждого пересчитанного этапа.
+        """
+        self._check_cancelled = check_cancelled
+        self._progress = progress
+        self._timer = timer
+        band = (freq_min, freq_max, zoom_points) if method == ZOOM else None
+        multitaper = (nw, n_tapers, adaptive) if method == MULTITAPER else None
+        key = spectrum_key(component, time_step, window, autocorr, method,
+                           segment, overlap, band, multitaper)
+        try:
+            def compute_raw():
+                n_fft, raw = self._compute(key, component, time_step, window, autocorr,
+                                           method, segment, overlap, band, multitaper)
+                return {"n_fft": np.array(n_fft or 0), "raw": raw}
+
+            # На диске — спектр до нормировки: шаг времени (кроме зума) и
+            # обнуление меняют только ось частот и начало спектра и
+            # пересчитываются в памяти, не порождая новых записей.
+            # Последний спектр держится в памяти, чтобы не читать его с диска
+            stored = self._remembered(
+                "raw", key, lambda: self._stored("spectrum", key, compute_raw))
+            n_fft, raw = int(stored["n_fft"]) or None, stored["raw"]
+            fft_vals = self._stage("normalize", key, lambda: normalize(raw))
+            return self._finish(key, n_fft, fft_vals, time_step, null_points, band)
+        finally:
+            self._check_cancelled = None
+            self._progress = None
+            self._timer = None
+
+    def _compute(self, key, component, time_step, window, autocorr, method, segment,
+                 overlap, band, multitaper):
+        """(n_fft, спектр до нормировки); для зума n_fft — None"""
+        if method == ZOOM:
+            zoom = partial(zoom_transform, time_step=time_step, freq_min=band[0],
+                           freq_max=band[1], n_points=band[2])
+            if component == VDOS:
+                n_fft, raw = self._stage(
+                    "fft", key, lambda: self._vdos(window, autocorr, zoom))
+            else:
+                n_fft, raw = self._spectrum(component, window, autocorr, zoom, key)
+        elif method == WELCH:
+            n_fft, raw = self._stage(
+                "fft", key, lambda: self._welch(component, window, segment, overlap))
+        elif method == MULTITAPER:
+            nw, n_tapers, adaptive = multitaper
+            tapers = self._tapers(len(self.data), nw, n_tapers)
+            n_fft, raw = self._stage(
+                "fft", key, lambda: self._multitaper(component, tapers, adaptive))
+        elif component == VDOS:
+            # Столбцы не копируются целиком: vdos читает их блоками
+            n_fft, raw = self._stage(
+                "fft", key, lambda: self._vdos(window, autocorr))
+        else:
+            n_fft, raw = self._spectrum(component, window, autocorr)
+        return n_fft, raw
+
+    def spectrogram(self, component, time_step, window, segment, overlap,
+                    check_cancelled=None, progress=None, timer=None):
+        """Спектрограмма: (времена кадров в пс, частоты в см⁻¹, мощность в дБ).
+
+        Кадры кэшируются по (component, window, segment, overlap): смена шага
+        времени, цветовой карты или пределов не требует пересчёта.
+        """
+        self._check_cancelled = check_cancelled
+        self._timer = timer
+        try:
+            step = segment - segment * overlap // 100
+
+            def frames():
+                columns, weights = self._columns(component)
+                power = stft_power(self.data, columns, segment,
+                                   segment * overlap // 100, window, weights,
+                                   check_cancelled=check_cancelled,
+                                   progress=progress)
+                # Логарифмическая шкала относительно максимума, не ниже -100 дБ
+                power /= power.max()
+                np.maximum(power, 1e-10, out=power)
+                return 10 * np.log10(power, out=power)
+
+            power_db = self._stage(
+                "stft", (component, window, segment, overlap), frames)
+        finally:
+            self._check_cancelled = None
+            self._timer = None
+        times = (np.arange(len(power_db)) * step + segment / 2) * time_step * 1e12
+        return Spectrogram(times, wavenumbers(segment, time_step), power_db)
+
+    def _finish(self, key, n_fft, fft_vals, time_step, null_points, band=None):
+        if band is not None:
+            freqs = self._stage("freqs", band, lambda: zoom_wavenumbers(*band))
+        else:
+            # Шаг времени влияет только на ось частот
+            freqs = self._stage(
+                "freqs", (n_fft, time_step), lambda: wavenumbers(n_fft, time_step))
+
+        def zero_leading():
+            if null_points <= 0:
+                return fft_vals
+            values = fft_vals.copy()
+            values[:null_points] = 0
+            return values
+
+        values = self._stage("null", key + (null_points,), zero_leading)
+        return freqs, values
+
+    def _spectrum(self, component, window, autocorr, zoom=None, zoom_key=None):
+        def windowed():
+            signal = self._stage("signal", (component,), lambda: self._extract(component))
+            return self._stage(
+                "window", (component, window), lambda: apply_window(signal, window))
+
+        def prepare():
+            if not autocorr:
+                return windowed()
+            # Автокорреляция не зависит от шага времени и метода: на диске
+            # она хранится отдельно от спектров
+            return self._stored(
+                "acf", key, lambda: {"acf": total_autocorrelation(windowed())})["acf"]
+
+        key = (component, window, autocorr)
+        prepared = self._stage("autocorr", key, prepare)
+
+        if zoom is not None:
+            # Ключ зума включает шаг времени и полосу: от них зависит преобразование
+            return self._stage(
+                "fft", zoom_key,
+                lambda: (None, zoom_spectrum(prepared, zoom, from_acf=autocorr)))
+        return self._stage(
+            "fft", key, lambda: amplitude_spectrum(prepared, from_acf=autocorr))
+
+    def _vdos(self, window, autocorr, zoom=None):
+        columns, weights = self._columns(VDOS)
+        return vdos(self.data, columns, weights, window, autocorr,
+                    check_cancelled=self._check_cancelled, zoom=zoom)
+
+    def _welch(self, component, window, segment, overlap):
+        """Спектр Уэлча: данные читаются блоками строк, память постоянна"""
+        columns, weights = self._columns(component)
+        accumulator = WelchAccumulator(
+            segment, segment * overlap // 100, window, weights)
+        N = len(self.data)
+        # Прочитанный блок и его копия с хвостом прошлого блока (feed)
+        # вместе занимают не больше BLOCK_MEMORY при любом числе столбцов
+        rows = max(1, min(WELCH_ROWS, BLOCK_MEMORY // (16 * len(columns))))
+        for start in range(0, N, rows):
+            if self._check_cancelled is not None:
+                self._check_cancelled()
+            accumulator.feed(self.data[start:start + rows, columns])
+            if self._progress is not None:
+                self._progress(100 * min(start + rows, N) // N)
+
+        return accumulator.n_fft, welch_values(component, accumulator.spectrum())
+
+    def _multitaper(self, component, tapers, adaptive):
+        columns, weights = self._columns(component)
+        tapers, ratios = tapers
+        n_fft, power = multitaper_power(self.data, columns, tapers, ratios, weights,
+                                        adaptive, check_cancelled=self._check_cancelled)
+        return n_fft, welch_values(component, power)
+
+    def _tapers(self, n, nw, n_tapers):
+        """Тапера DPSS: из памяти, с диска или сгенерированные заново.
+
+        Они зависят только от длины сигнала и NW, поэтому на диске общие
+        для всех файлов той же длины. Хранятся в float32 — вдвое меньше
+        памяти при точности, далеко превосходящей точность спектра.
+        Тапера больше 1/TAPER_CACHE_SHARE кэша результатов на диск не
+        пишутся, чтобы не вытеснять из него спектры.
+        """
+        def generate():
+            tapers, ratios = dpss_tapers(n, nw, n_tapers)
+            return {"tapers": tapers.astype(np.float32), "ratios": ratios}
+
+        def load():
+            k = n_tapers if n_tapers > 0 else max(int(2 * nw) - 1, 1)
+            if (self.store is not None
+                    and 4 * k * n > self.store.max_bytes // TAPER_CACHE_SHARE):
+                arrays = generate()
+            else:
+                arrays = self._stored("dpss", (n, nw, n_tapers, "float32"), generate,
+                                      shared=True)
+            return arrays["tapers"], arrays["ratios"]
+
+        return self._stage("tapers", (n, nw, n_tapers), load)
+
+
+class LiveSpectrum:
+    """Спектр Уэлча файла, который ещё дописывается.
+
+    refresh() разбирает только новые строки и добавляет их сегменты
+    в накопленную периодограмму, поэтому стоимость обновления зависит
+    от объёма дописанных данных, а не от длины файла.
+    """
+
+    def __init__(self, path, component, window, segment, overlap,
+                 masses=None, dtype=np.float64):
+        self.reader = TailReader(path, dtype)
+        self.component = component
+        self.window = window
+        self.segment = segment
+        self.overlap = segment * overlap // 100
+        self.masses = masses
+        self.accumulator = None
+        self.columns = None
+        self.n_rows = 0
+
+    def refresh(self):
+        """Читает дописанные строки; возвращает их число"""
+        block = self.reader.read_new()
+        if self.reader.reset:
+            self.accumulator = None
+            self.n_rows = 0
+        if len(block) == 0:
+            return 0
+        if self.accumulator is None:
+            self.columns, weights = select_columns(
+                self.component, block.shape[1], self.masses)
+            self.accumulator = WelchAccumulator(
+                self.segment, self.overlap, self.window, weights)
+        self.accumulator.feed(block[:, self.columns])
+        self.n_rows += len(block)
+        return len(block)
+
+    @property
+    def pending(self):
+        """В файле остались строки, не прочитанные последним refresh()"""
+        return self.reader.pending
+
+    def result(self, time_step, null_points):
+        """(частоты, спектр) или None, пока не набран ни один сегмент"""
+        if self.accumulator is None or self.accumulator.count == 0:
+            return None
+        values = normalize(welch_values(self.component, self.accumulator.spectrum()))
+        if null_points > 0:
+            values[:null_points] = 0
+        return wavenumbers(self.accumulator.n_fft, time_step), values
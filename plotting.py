@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def minmax_decimate(x, y, x_min, x_max, n_bins):
+    """Прореживание линии до видимого диапазона с сохранением пиков.
+
+    x должен возрастать. Берутся точки в [x_min, x_max] и по одной соседней
+    с каждой стороны (чтобы линия доходила до краёв), затем они делятся на
+    n_bins корзин, и в каждой остаются минимум и максимум. Так ни один
+    пик не теряется, а точек на линии — порядка двух на пиксель.
+    """
+    start = max(np.searchsorted(x, x_min, side="left") - 1, 0)
+    stop = min(np.searchsorted(x, x_max, side="right") + 1, len(x))
+    x, y = x[start:stop], y[start:stop]
+    if n_bins <= 0 or len(x) <= 4 * n_bins:
+        return x, y
+
+    per_bin = len(x) // n_bins
+    n = per_bin * n_bins
+    blocks = y[:n].reshape(n_bins, per_bin)
+    offsets = np.arange(n_bins) * per_bin
+    keep = np.concatenate((
+        blocks.argmin(axis=1) + offsets,
+        blocks.argmax(axis=1) + offsets,
+        np.arange(n, len(x)),     # остаток, не вошедший в корзины
+        [0, len(x) - 1],
+    ))
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+def annotate_peaks(ax, fit, x_min, x_max, n_points=2000):
+    """Подогнанный спектр пунктиром и отметки пиков с частотами на осях ax.
+
+    Возвращает созданные элементы, чтобы их можно было удалить.
+    """
+    from peaks import peak_model
+
+    if len(fit.position) == 0:
+        return []
+    x = np.linspace(x_min, x_max, n_points)
+    artists = ax.plot(x, peak_model(x, fit), "--", color="gray", linewidth=1)
+    tops = fit.amplitude + fit.baseline
+    artists += ax.plot(fit.position, tops, "v", color="black", markersize=4)
+    for position, top in zip(fit.position, tops):
+        artists.append(ax.annotate(f"{position:.1f}", (position, top),
+                                   xytext=(0, 6), textcoords="offset points",
+                                   ha="center", fontsize=8))
+    return artists
@@ -0,0 +1,93 @@
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+
+from loader import CACHE_DIR
+
+RESULTS_DIR = os.path.join(CACHE_DIR, "results")
+MAX_BYTES = 1024 * 1024 * 1024  # размер кэша результатов по умолчанию
+
+
+class ResultCache:
+    """Результаты расчётов на диске: по файлу .npz на ключ.
+
+    Ключ — кортеж из строк и чисел (хеш данных и параметры расчёта);
+    имя файла — его хеш, а сам ключ хранится в файле и сверяется при
+    чтении. Время изменения файла обновляется при каждом чтении, и при
+    превышении max_bytes удаляются давно не использованные записи (LRU).
+    Кэш может быть общим для нескольких процессов: запись атомарна,
+    а исчезнувший при вытеснении файл считается промахом.
+    """
+
+    def __init__(self, directory=RESULTS_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".npz")
+
+    def get(self, key):
+        """Словарь массивов, сохранённых по ключу, или None"""
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                if str(f["__key__"]) != repr(key):
+                    return None
+                arrays = {name: f[name] for name in f.files if name != "__key__"}
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return arrays
+
+    def put(self, key, **arrays):
+        """Сохраняет массивы; записи больше max_bytes не сохраняются"""
+        if sum(a.nbytes for a in arrays.values()) > self.max_bytes:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, __key__=np.array(repr(key)), **arrays)
+                os.replace(tmp_path, self._path(key))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш больше max_bytes.
+
+        max_bytes = 0 означает «не сохранять новое»: уже сохранённые записи
+        при этом не удаляются.
+        """
+        if self.max_bytes <= 0:
+            return
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".npz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,371 @@
+import numpy as np
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+
+SPEED_OF_LIGHT = 2.99792458e10  # см/с, для перевода Гц в см⁻¹
+BLOCK_MEMORY = 256 * 1024 * 1024  # байт на блок столбцов в vdos
+
+WINDOWS = {
+    "Hann": np.hanning,
+    "Hamming": np.hamming,
+    "Blackman": np.blackman,
+}
+
+
+def wavenumbers(n_fft, time_step):
+    """Частоты бинов rfft длины n_fft в см⁻¹ (time_step в секундах)"""
+    return rfftfreq(n_fft, time_step) / SPEED_OF_LIGHT
+
+
+def zoom_wavenumbers(freq_min, freq_max, n_points):
+    """Частоты зум-спектра в см⁻¹: n_points точек от freq_min до freq_max"""
+    return np.linspace(freq_min, freq_max, n_points)
+
+
+def zoom_transform(n, time_step, freq_min, freq_max, n_points):
+    """Chirp-z преобразование (zoom FFT) сигналов длины n на частотах
+    zoom_wavenumbers(freq_min, freq_max, n_points).
+
+    Шаг по частоте задаётся числом точек, а не длиной сигнала: тонкое
+    разрешение в узкой полосе получается без дополнения нулями всего
+    сигнала, за время порядка (n + n_points)·log(n + n_points).
+    """
+    from scipy.signal import ZoomFFT  # scipy.signal импортируется секунду и дольше
+
+    nyquist = 0.5 / time_step / SPEED_OF_LIGHT
+    if not 0 <= freq_min < freq_max <= nyquist:
+        raise ValueError(f"диапазон зум-FFT должен лежать в 0..{nyquist:.0f} см⁻¹")
+    return ZoomFFT(n, [freq_min * SPEED_OF_LIGHT, freq_max * SPEED_OF_LIGHT],
+                   m=n_points, fs=1 / time_step, endpoint=True)
+
+
+def _columns(signals):
+    """Приводит (N,) к (N, 1): все функции работают со столбцами вдоль оси 0"""
+    return signals.reshape(len(signals), -1)
+
+
+def power_spectrum(signals, n_fft=None, workers=None):
+    """|rfft|² каждого столбца, с дополнением нулями до n_fft.
+
+    По умолчанию n_fft = next_fast_len(N): на длинах с большими простыми
+    множителями это в разы быстрее преобразования исходной длины.
+    """
+    signals = _columns(signals)
+    if n_fft is None:
+        n_fft = next_fast_len(len(signals), real=True)
+    spectrum = rfft(signals, n=n_fft, axis=0, workers=workers)
+    return spectrum.real ** 2 + spectrum.imag ** 2
+
+
+def autocorrelation(signals, max_lag=None, unbiased=True, workers=None):
+    """Автокорреляция столбцов по теореме Винера–Хинчина.
+
+    Считается как обратное преобразование спектра мощности; дополнение
+    нулями до длины ≥ 2N - 1 исключает циклическое наложение. При unbiased
+    значение на лаге k делится на число слагаемых N - k.
+    Возвращает лаги 0 .. max_lag - 1.
+    """
+    signals = _columns(signals)
+    N = len(signals)
+    max_lag = N if max_lag is None else min(max_lag, N)
+    n_fft = next_fast_len(2 * N - 1, real=True)
+    acf = irfft(power_spectrum(signals, n_fft, workers), n=n_fft,
+                axis=0, workers=workers)[:max_lag]
+    if unbiased:
+        acf /= (N - np.arange(max_lag))[:, None]
+    else:
+        acf /= N
+    return acf
+
+
+def acf_spectrum(acf, workers=None):
+    """Спектр автокорреляции, продолженной чётно на лаги от -M до M.
+
+    Нули вставляются между положительными и отрицательными лагами, поэтому
+    последовательность остаётся циклически чётной и её спектр вещественный.
+    Возвращает (n_fft, спектр по столбцам).
+    """
+    acf = _columns(acf)
+    M = len(acf)
+    n_fft = next_fast_len(2 * M - 1, real=True)
+    extended = np.zeros((n_fft,) + acf.shape[1:], dtype=acf.dtype)
+    extended[:M] = acf
+    extended[n_fft - M + 1:] = acf[:0:-1]
+    return n_fft, rfft(extended, axis=0, workers=workers).real
+
+
+def total_autocorrelation(signals, workers=None):
+    """Сумма автокорреляций столбцов (полная VACF для x, y, z) на лагах до N/4.
+
+    Все столбцы считаются одним пакетным преобразованием.
+    """
+    signals = _columns(signals)
+    return autocorrelation(signals, max_lag=max(len(signals) // 4, 1),
+                           workers=workers).sum(axis=1)
+
+
+def amplitude_spectrum(signals, from_acf=False, workers=None):
+    """Суммарный по столбцам спектр за одно пакетное преобразование.
+
+    Для сигналов — корень из суммарной мощности (для одного столбца
+    это |rfft|); при from_acf signals — автокорреляция на лагах ≥ 0,
+    и возвращается модуль спектра её чётного продолжения.
+    Возвращает (n_fft, спектр).
+    """
+    if from_acf:
+        n_fft, spectrum = acf_spectrum(signals, workers)
+        return n_fft, np.abs(spectrum[:, 0])
+    signals = _columns(signals)
+    n_fft = next_fast_len(len(signals), real=True)
+    power = power_spectrum(signals, n_fft, workers).sum(axis=1)
+    return n_fft, np.sqrt(power)
+
+
+def zoom_power(signals, zoom):
+    """|X(f)|² каждого столбца на частотах зума; zoom(n) — преобразование
+    для сигналов длины n (zoom_transform с заданными остальными параметрами)"""
+    signals = _columns(signals)
+    spectrum = zoom(len(signals))(signals, axis=0)
+    return spectrum.real ** 2 + spectrum.imag ** 2
+
+
+def zoom_spectrum(signals, zoom, from_acf=False):
+    """То же, что amplitude_spectrum, но на частотах зума.
+
+    Для автокорреляции спектр чётного продолжения считается без его
+    построения: 2·Re X(f) − acf[0], где X — преобразование лагов ≥ 0.
+    """
+    signals = _columns(signals)
+    if from_acf:
+        spectrum = zoom(len(signals))(signals[:, 0])
+        return np.abs(2 * spectrum.real - signals[0, 0])
+    return np.sqrt(zoom_power(signals, zoom).sum(axis=1))
+
+
+def vdos(data, columns, weights=None, window="None", autocorr=False,
+         workers=-1, check_cancelled=None, zoom=None):
+    """Колебательная плотность состояний: взвешенная сумма спектров столбцов.
+
+    Столбцы data[:, columns] обрабатываются блоками так, чтобы копия блока
+    и его преобразование занимали не больше BLOCK_MEMORY; каждый блок —
+    одно пакетное rfft на workers потоках. weights — вес каждого столбца
+    (масса атома). Без автокорреляции возвращается Σ wᵢ|Vᵢ|², с ней —
+    спектр взвешенной суммы автокорреляций на лагах до N/4.
+    С zoom (см. zoom_power) спектр считается только на частотах зума.
+    Возвращает (n_fft, спектр); с zoom n_fft — None.
+    """
+    columns = np.asarray(columns)
+    if weights is None:
+        weights = np.ones(len(columns))
+    N = len(data)
+    max_lag = max(N // 4, 1)
+    n_fft = next_fast_len(N if not autocorr else 2 * N - 1, real=True)
+    block = max(1, BLOCK_MEMORY // (8 * N + 16 * n_fft))
+    taper = WINDOWS[window](N)[:, None] if window in WINDOWS else None
+
+    total = None
+    for start in range(0, len(columns), block):
+        if check_cancelled is not None:
+            check_cancelled()
+        signals = np.array(data[:, columns[start:start + block]], dtype=float)
+        signals -= signals.mean(axis=0)
+        if taper is not None:
+            signals *= taper
+        w = weights[start:start + block]
+        if autocorr:
+            part = autocorrelation(signals, max_lag, workers=workers) @ w
+        elif zoom is not None:
+            part = zoom_power(signals, zoom) @ w
+        else:
+            part = power_spectrum(signals, n_fft, workers) @ w
+        total = part if total is None else total + part
+
+    if zoom is not None:
+        return None, zoom_spectrum(total, zoom, from_acf=True) if autocorr else total
+    if autocorr:
+        n_fft, spectrum = acf_spectrum(total, workers)
+        return n_fft, np.abs(spectrum[:, 0])
+    return n_fft, total
+
+
+def dpss_tapers(n, nw, k=0):
+    """k тапер DPSS (последовательностей Слепиана) длины n: (тапера (k, n), доли
+    энергии в полосе ±NW/n). По умолчанию k = 2·NW − 1 — все тапера с долей,
+    близкой к 1.
+
+    Генерация длинных тапер занимает секунды, поэтому их кэширует конвейер.
+    """
+    from scipy.signal.windows import dpss
+
+    if k <= 0:
+        k = max(int(2 * nw) - 1, 1)
+    if not 0 < nw < n / 2:
+        raise ValueError(f"NW должно лежать в 0..{n // 2} (половина длины сигнала)")
+    if k > n:
+        raise ValueError("тапер больше, чем точек сигнала")
+    tapers, ratios = dpss(n, nw, k, return_ratios=True)
+    return np.atleast_2d(tapers), np.atleast_1d(ratios)
+
+
+def multitaper_power(data, columns, tapers, ratios, weights=None, adaptive=True,
+                     workers=-1, check_cancelled=None):
+    """Мультитаперная оценка спектра мощности, суммированная по столбцам с весами.
+
+    Каждый блок столбцов умножается на все тапера сразу, и произведения
+    (тапера × точки × столбцы) преобразуются одним пакетным rfft на workers
+    потоках; блок выбирается так, чтобы он занимал не больше BLOCK_MEMORY.
+    Если и один столбец со всеми таперами больше BLOCK_MEMORY, столбцы
+    берутся по одному, а тапера — группами, умещающимися в этот предел
+    (не меньше одного тапера за раз).
+    Собственные спектры усредняются с адаптивными весами Томсона
+    (adaptive_average) или поровну. Возвращает (n_fft, спектр).
+    """
+    columns = np.asarray(columns)
+    if weights is None:
+        weights = np.ones(len(columns))
+    N = len(data)
+    K = len(tapers)
+    n_fft = next_fast_len(N, real=True)
+    per_taper = 8 * N + 16 * n_fft  # байт на тапер и столбец
+    block = BLOCK_MEMORY // (K * per_taper)
+    taper_block = K
+    if block == 0:
+        block = 1
+        taper_block = max(1, BLOCK_MEMORY // per_taper)
+
+    eigen = np.zeros((K, n_fft // 2 + 1))
+    variance = 0.0
+    for start in range(0, len(columns), block):
+        signals = np.array(data[:, columns[start:start + block]], dtype=float)
+        signals -= signals.mean(axis=0)
+        w = weights[start:start + block]
+        for k in range(0, K, taper_block):
+            if check_cancelled is not None:
+                check_cancelled()
+            spectrum = rfft(tapers[k:k + taper_block, :, None] * signals, n=n_fft,
+                            axis=1, workers=workers)
+            eigen[k:k + taper_block] += (spectrum.real ** 2 + spectrum.imag ** 2) @ w
+        variance += signals.var(axis=0) @ w
+
+    if adaptive and K > 1 and variance > 0:
+        return n_fft, adaptive_average(eigen, ratios, variance)
+    return n_fft, eigen.mean(axis=0)
+
+
+def adaptive_average(eigen, ratios, variance, tol=1e-4, max_iter=100):
+    """Адаптивное взвешивание собственных спектров (Томсон, 1982).
+
+    На частотах, где спектр мал, тапера с меньшей долей энергии в полосе
+    (ratios) дают заметную утечку от сильных пиков, и их вес снижается:
+    d_k = S / (λ_k·S + (1 − λ_k)·σ²), S = Σ λ_k·d_k²·S_k / Σ λ_k·d_k².
+    Итерации вектором по всем частотам сразу, начиная со среднего двух
+    первых спектров; variance — σ², дисперсия сигнала.
+    """
+    lam = ratios[:, None]
+    leakage = (1 - lam) * variance
+    spectrum = eigen[:2].mean(axis=0)
+    for _ in range(max_iter):
+        d = spectrum / (lam * spectrum + leakage)
+        w = lam * d ** 2
+        updated = (w * eigen).sum(axis=0) / np.maximum(w.sum(axis=0), 1e-300)
+        converged = np.all(np.abs(updated - spectrum) <= tol * np.maximum(updated, 1e-300))
+        spectrum = updated
+        if converged:
+            break
+    return spectrum
+
+
+class WelchAccumulator:
+    """Усреднённая по перекрывающимся сегментам периодограмма (метод Уэлча).
+
+    Данные подаются блоками строк через feed(); хвост, не вошедший в полный
+    сегмент, сохраняется до следующего блока. Память не зависит от длины
+    траектории: в ней держатся только текущий блок и сумма периодограмм.
+    weights — вес каждого столбца при суммировании.
+    """
+
+    def __init__(self, segment, overlap, window="Hann", weights=None, workers=-1):
+        if not 0 <= overlap < segment:
+            raise ValueError("перекрытие должно быть меньше длины сегмента")
+        self.segment = segment
+        self.step = segment - overlap
+        self.taper = (WINDOWS[window](segment) if window in WINDOWS
+                      else np.ones(segment))
+        self.weights = weights
+        self.workers = workers
+        self.n_fft = segment
+        self.total = np.zeros(segment // 2 + 1)
+        self.count = 0
+        self._tail = None
+
+    def feed(self, block):
+        """Добавляет строки (n, k) и учитывает все завершённые сегменты"""
+        block = _columns(block)
+        if self._tail is not None and len(self._tail):
+            block = np.concatenate([self._tail, block])
+        n_segments = (len(block) - self.segment) // self.step + 1
+        if n_segments <= 0:
+            self._tail = block
+            return
+
+        weights = self.weights
+        if weights is None:
+            weights = np.ones(block.shape[1])
+        # Сегменты обрабатываются пачками, чтобы не раздувать память
+        batch = max(1, BLOCK_MEMORY // (24 * self.segment * block.shape[1]))
+        view = np.lib.stride_tricks.sliding_window_view(
+            block, self.segment, axis=0)[::self.step]
+        for start in range(0, n_segments, batch):
+            segments = np.array(view[start:start + batch], dtype=float)
+            segments -= segments.mean(axis=-1, keepdims=True)
+            segments *= self.taper
+            spectrum = rfft(segments, axis=-1, workers=self.workers)
+            power = spectrum.real ** 2 + spectrum.imag ** 2
+            self.total += np.einsum("skf,k->f", power, weights)
+        self.count += n_segments
+        self._tail = block[n_segments * self.step:].copy()
+
+    def spectrum(self):
+        """Средняя периодограмма; нормировка на энергию окна"""
+        if self.count == 0:
+            raise ValueError("данных меньше, чем длина одного сегмента")
+        return self.total / (self.count * np.sum(self.taper ** 2))
+
+
+def stft_power(data, columns, segment, overlap, window="Hann", weights=None,
+               workers=-1, check_cancelled=None, progress=None):
+    """Кадры кратковременного спектра мощности (спектрограмма).
+
+    Кадры длины segment с перекрытием overlap точек считаются пачками:
+    за раз из data читается не больше строк, чем помещается в BLOCK_MEMORY,
+    и все кадры пачки преобразуются одним rfft. Мощность столбцов
+    суммируется с весами weights. Возвращает массив float32
+    (кадры, segment // 2 + 1).
+    """
+    columns = np.asarray(columns)
+    if weights is None:
+        weights = np.ones(len(columns))
+    step = segment - overlap
+    if step <= 0:
+        raise ValueError("перекрытие должно быть меньше длины сегмента")
+    n_frames = (len(data) - segment) // step + 1
+    if n_frames <= 0:
+        raise ValueError("данных меньше, чем длина одного сегмента")
+    taper = WINDOWS[window](segment) if window in WINDOWS else np.ones(segment)
+
+    frames = np.empty((n_frames, segment // 2 + 1), dtype=np.float32)
+    batch = max(1, BLOCK_MEMORY // (24 * segment * len(columns)))
+    for first in range(0, n_frames, batch):
+        if check_cancelled is not None:
+            check_cancelled()
+        last = min(first + batch, n_frames)
+        rows = data[first * step:(last - 1) * step + segment, columns]
+        segments = np.array(np.lib.stride_tricks.sliding_window_view(
+            rows, segment, axis=0)[::step], dtype=float)
+        segments -= segments.mean(axis=-1, keepdims=True)
+        segments *= taper
+        spectrum = rfft(segments, axis=-1, workers=workers)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        frames[first:last] = np.einsum("skf,k->sf", power, weights)
+        if progress is not None:
+            progress(100 * last // n_frames)
+    return frames
@@ -0,0 +1,22 @@
+import time
+
+from instrumentation import StageTimer
+
+
+def test_nested_stage_time_is_excluded_from_outer():
+    timer = StageTimer(track_memory=True)
+    start = time.perf_counter()
+    with timer.stage("autocorr"):
+        with timer.stage("window"):
+            time.sleep(0.05)
+            inner = bytearray(4 * 2**20)
+            del inner
+        time.sleep(0.02)
+    elapsed = time.perf_counter() - start
+
+    window, autocorr = timer.stages
+    assert window["stage"] == "window" and window["seconds"] >= 0.05
+    assert autocorr["seconds"] < 0.05
+    assert timer.total() <= elapsed
+    # Пик вложенного этапа не приписывается внешнему
+    assert window["peak_bytes"] >= 4 * 2**20 > autocorr["peak_bytes"]
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+from loader import TailReader, load_trajectory
+
+
+def test_tail_reader_reads_in_bounded_chunks(tmp_path):
+    data = np.arange(3000, dtype=float).reshape(-1, 3)
+    path = tmp_path / "run.txt"
+    np.savetxt(path, data[:600])
+    reader = TailReader(str(path), chunk_size=1000)
+
+    blocks = [reader.read_new()]
+    while reader.pending:
+        blocks.append(reader.read_new())
+    assert len(blocks) > 10
+    np.testing.assert_array_equal(np.concatenate(blocks), data[:600])
+
+    # Дописанные строки, последняя — без перевода строки
+    with open(path, "a") as f:
+        np.savetxt(f, data[600:])
+        f.write("1 2")
+    blocks = [reader.read_new()]
+    while reader.pending:
+        blocks.append(reader.read_new())
+    np.testing.assert_array_equal(np.concatenate(blocks), data[600:])
+    assert reader.read_new().shape == (0, 3)
+
+
+def test_ragged_lines_are_rejected(tmp_path):
+    path = tmp_path / "ragged.txt"
+    path.write_text("1 2 3 4\n1 2 3 4 5 6 7 8\n1 2 3\n9 9 9 9 9\n")
+    with pytest.raises(ValueError):
+        load_trajectory(str(path))
+    assert not os.path.exists(str(path) + ".float64.bin")
+    with pytest.raises(ValueError):
+        TailReader(str(path)).read_new()
+
+
+def test_blank_lines_are_skipped(tmp_path):
+    path = tmp_path / "blank.txt"
+    path.write_text("1 2 3 4\n\n  \n5 6 7 8\n")
+    np.testing.assert_array_equal(load_trajectory(str(path)),
+                                  [[1, 2, 3, 4], [5, 6, 7, 8]])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import peaks
+from peaks import analyze_peaks, band_slice, find_band_peaks, peak_model
+
+
+def synthetic(shape):
+    """Два перекрывающихся пика на постоянном фоне"""
+    freqs = np.linspace(0, 2000, 8001)
+    fit = peaks.PeakFit(np.array([950.0, 1000.0]), np.array([1.0, 0.6]),
+                        np.array([30.0, 40.0]), None, shape, 0.05)
+    return freqs, peak_model(freqs, fit), fit
+
+
+@pytest.mark.parametrize("shape", peaks.SHAPES)
+def test_fit_recovers_overlapping_peaks(shape):
+    freqs, values, true = synthetic(shape)
+    fit = analyze_peaks(freqs, values, 800, 1200, shape=shape)
+    np.testing.assert_allclose(fit.position, true.position, atol=0.05)
+    np.testing.assert_allclose(fit.amplitude, true.amplitude, rtol=1e-3)
+    np.testing.assert_allclose(fit.width, true.width, rtol=1e-3)
+    if shape == "lorentz":
+        area = np.pi * true.amplitude * true.width / 2
+    else:
+        area = true.amplitude * true.width * np.sqrt(np.pi / (4 * np.log(2)))
+    np.testing.assert_allclose(fit.area, area, rtol=1e-3)
+    assert fit.baseline == pytest.approx(true.baseline, abs=1e-3)
+
+
+@pytest.mark.parametrize("shape", peaks.SHAPES)
+def test_line_derivatives_match_finite_differences(shape):
+    x = np.linspace(900, 1100, 201)
+    position = np.array([980.0, 1010.0])
+    amplitude = np.array([1.0, 0.5])
+    width = np.array([25.0, 35.0])
+    _, profile, d_position, d_width = peaks._lines(x, position, amplitude, width, shape)
+
+    def total(position, amplitude, width):
+        return peaks._lines(x, position, amplitude, width, shape)[0]
+
+    h = 1e-6
+    for k in range(2):
+        step = np.eye(2)[k] * h
+        numeric = [(total(position + step, amplitude, width)
+                    - total(position - step, amplitude, width))[:, k] / (2 * h),
+                   (total(position, amplitude + step, width)
+                    - total(position, amplitude - step, width))[:, k] / (2 * h),
+                   (total(position, amplitude, width + step)
+                    - total(position, amplitude, width - step))[:, k] / (2 * h)]
+        np.testing.assert_allclose(d_position[:, k], numeric[0], atol=1e-7)
+        np.testing.assert_allclose(profile[:, k], numeric[1], atol=1e-7)
+        np.testing.assert_allclose(d_width[:, k], numeric[2], atol=1e-7)
+
+
+def test_peaks_outside_band_are_ignored():
+    freqs, values, _ = synthetic("lorentz")
+    band = band_slice(freqs, 900, 1100)
+    assert freqs[band.start] >= 900 and freqs[band.stop - 1] <= 1100
+    found, _ = find_band_peaks(freqs, values, 1100, 2000)
+    assert len(found) == 0
+    found, widths = find_band_peaks(freqs, values, 900, 1100)
+    # Перекрытие немного сдвигает максимумы относительно центров линий
+    np.testing.assert_allclose(freqs[found], [950.0, 1000.0], atol=2)
+    assert np.all(widths > 0)
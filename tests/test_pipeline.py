@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from choices import MODULUS, SUM_XYZ, VDOS, WELCH
+from pipeline import SpectrumPipeline, select_columns
+
+
+@pytest.mark.parametrize("n_columns, column", [(4, 3), (5, 4)])
+def test_modulus_column_of_single_particle_file(n_columns, column):
+    columns, _ = select_columns(MODULUS, n_columns)
+    assert list(columns) == [column]
+
+
+@pytest.mark.parametrize("n_columns", [3, 6, 7])
+def test_modulus_rejected_for_atom_layouts(n_columns):
+    with pytest.raises(ValueError):
+        select_columns(MODULUS, n_columns)
+
+
+def test_vdos_columns_and_weights():
+    columns, weights = select_columns(VDOS, 7, masses=np.array([1.0, 16.0]))
+    assert list(columns) == [1, 2, 3, 4, 5, 6]
+    assert list(weights) == [1, 1, 1, 16, 16, 16]
+    columns, _ = select_columns(SUM_XYZ, 6)
+    assert list(columns) == [0, 1, 2]
+
+
+def test_modulus_of_three_column_file_is_an_error():
+    data = np.random.default_rng(0).normal(size=(256, 3))
+    with pytest.raises(ValueError):
+        SpectrumPipeline(data).compute(MODULUS, 1e-15, "None", False, 0)
+
+
+def test_set_masses_recomputes_vdos_spectrogram():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(2048, 6))
+    data[:, 3:] *= 3
+    pipeline = SpectrumPipeline(data)
+    before = pipeline.spectrogram(VDOS, 1e-15, "Hann", 256, 50).power_db
+    pipeline.set_masses(np.array([1.0, 16.0]))
+    after = pipeline.spectrogram(VDOS, 1e-15, "Hann", 256, 50).power_db
+    fresh = SpectrumPipeline(data)
+    fresh.set_masses(np.array([1.0, 16.0]))
+    expected = fresh.spectrogram(VDOS, 1e-15, "Hann", 256, 50).power_db
+    assert not np.array_equal(before, after)
+    np.testing.assert_array_equal(after, expected)
+
+
+def test_disk_cache_keeps_one_entry_per_raw_spectrum(tmp_path):
+    from result_cache import ResultCache
+
+    path = tmp_path / "traj.txt"
+    data = np.random.default_rng(2).normal(size=(512, 4))
+    np.savetxt(path, data)
+    store = ResultCache(str(tmp_path / "results"))
+
+    def compute(time_step, null_points):
+        pipeline = SpectrumPipeline(data)
+        pipeline.set_store(store, str(path), data.dtype)
+        return pipeline.compute(0, time_step, "Hann", False, null_points)
+
+    freqs, values = compute(1e-15, 0)
+    assert len(list((tmp_path / "results").iterdir())) == 1
+    # Шаг времени и обнуление не входят в ключ записи на диске
+    cached_freqs, cached_values = compute(2e-15, 5)
+    assert len(list((tmp_path / "results").iterdir())) == 1
+    np.testing.assert_allclose(cached_freqs, freqs / 2)
+    assert np.all(cached_values[:5] == 0)
+    np.testing.assert_allclose(cached_values[5:], values[5:])
+
+
+def test_disk_cache_ignores_file_changed_after_load(tmp_path):
+    from pipeline import file_stamp
+    from result_cache import ResultCache
+
+    path = tmp_path / "traj.txt"
+    data = np.random.default_rng(3).normal(size=(256, 4))
+    np.savetxt(path, data)
+    stamp = file_stamp(str(path))
+    np.savetxt(path, data[:128])
+    store = ResultCache(str(tmp_path / "results"))
+    pipeline = SpectrumPipeline(data)
+    pipeline.set_store(store, str(path), data.dtype, stamp)
+    pipeline.compute(0, 1e-15, "None", False, 0)
+    assert not (tmp_path / "results").exists()
+
+
+def test_welch_read_block_shrinks_with_column_count(monkeypatch):
+    import pipeline
+
+    data = np.random.default_rng(5).normal(size=(5000, 7))
+    masses = np.array([1.0, 16.0])
+
+    def welch():
+        p = SpectrumPipeline(data)
+        p.set_masses(masses)
+        return p.compute(VDOS, 1e-15, "Hann", False, 0, method=WELCH, segment=256)
+
+    expected = welch()
+    reads = []
+    monkeypatch.setattr(pipeline, "BLOCK_MEMORY", 16 * 6 * 300)
+    monkeypatch.setattr(pipeline.WelchAccumulator, "feed",
+                        lambda self, block, feed=pipeline.WelchAccumulator.feed:
+                        (reads.append(len(block)), feed(self, block))[1])
+    freqs, values = welch()
+    assert max(reads) == 300
+    np.testing.assert_array_equal(freqs, expected[0])
+    np.testing.assert_allclose(values, expected[1])
+
+
+def test_large_tapers_are_not_written_to_disk(tmp_path):
+    from choices import MULTITAPER
+    from result_cache import ResultCache
+
+    path = tmp_path / "traj.txt"
+    data = np.random.default_rng(8).normal(size=(2000, 4))
+    np.savetxt(path, data)
+    results = tmp_path / "results"
+
+    def entries(max_bytes):
+        pipeline = SpectrumPipeline(data)
+        pipeline.set_store(ResultCache(str(results), max_bytes), str(path), data.dtype)
+        pipeline.compute(0, 1e-15, "None", False, 0, method=MULTITAPER, nw=4)
+        assert pipeline._cache["tapers"][1][0].dtype == np.float32
+        names = sorted(results.iterdir())
+        for name in names:
+            name.unlink()
+        return len(names)
+
+    # 7 тапер × 2000 точек × 4 байта = 56000 байт
+    assert entries(8 * 56000) == 2
+    assert entries(8 * 56000 - 8) == 1
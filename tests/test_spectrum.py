@@ -0,0 +1,115 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from plotting import minmax_decimate
+import spectrum
+from spectrum import (SPEED_OF_LIGHT, acf_spectrum, autocorrelation, dpss_tapers,
+                      multitaper_power, total_autocorrelation, zoom_spectrum,
+                      zoom_transform, zoom_wavenumbers)
+
+
+def direct_autocorrelation(x, max_lag, unbiased):
+    N = len(x)
+    acf = np.array([np.dot(x[:N - k], x[k:]) for k in range(max_lag)])
+    return acf / (N - np.arange(max_lag)) if unbiased else acf / N
+
+
+@pytest.mark.parametrize("unbiased", [True, False])
+def test_autocorrelation_matches_direct_sum(unbiased):
+    rng = np.random.default_rng(0)
+    signals = rng.normal(size=(257, 3))
+    acf = autocorrelation(signals, max_lag=100, unbiased=unbiased)
+    assert acf.shape == (100, 3)
+    for column in range(3):
+        expected = direct_autocorrelation(signals[:, column], 100, unbiased)
+        np.testing.assert_allclose(acf[:, column], expected, atol=1e-12)
+
+
+def test_total_autocorrelation_sums_columns():
+    rng = np.random.default_rng(1)
+    signals = rng.normal(size=(200, 3))
+    expected = sum(direct_autocorrelation(signals[:, c], 50, True) for c in range(3))
+    np.testing.assert_allclose(total_autocorrelation(signals), expected, atol=1e-12)
+
+
+def test_acf_spectrum_matches_even_extension():
+    rng = np.random.default_rng(2)
+    acf = rng.normal(size=(50, 2))
+    n_fft, spectrum = acf_spectrum(acf)
+    assert n_fft >= 2 * len(acf) - 1
+    for column in range(2):
+        extended = np.zeros(n_fft)
+        extended[:50] = acf[:, column]
+        extended[n_fft - 49:] = acf[:0:-1, column]
+        expected = np.fft.rfft(extended)
+        np.testing.assert_allclose(spectrum[:, column], expected.real, atol=1e-10)
+        np.testing.assert_allclose(expected.imag, 0, atol=1e-10)
+
+
+def test_minmax_decimate_keeps_peaks():
+    rng = np.random.default_rng(3)
+    x = np.linspace(0, 1000, 100_001)
+    y = rng.normal(scale=0.01, size=len(x))
+    peaks = [1234, 50_000, 98_765]
+    y[peaks] = [5.0, -4.0, 3.0]
+    dx, dy = minmax_decimate(x, y, 0, 1000, 200)
+    assert len(dx) <= 2 * 200 + len(x) % 200 + 2
+    assert np.all(np.diff(dx) > 0)
+    for index in peaks:
+        assert x[index] in dx
+    assert dy.max() == y.max() and dy.min() == y.min()
+
+
+def test_minmax_decimate_reaches_range_edges():
+    x = np.arange(1000.0)
+    y = np.sin(x)
+    dx, _ = minmax_decimate(x, y, 100.5, 900.5, 50)
+    assert dx[0] <= 100.5 and dx[-1] >= 900.5
+
+
+def test_multitaper_power_chunks_tapers_within_block_memory(monkeypatch):
+    data = np.random.default_rng(4).normal(size=(1000, 3))
+    tapers, ratios = dpss_tapers(len(data), 4)
+    expected = multitaper_power(data, [0, 1, 2], tapers, ratios)
+    # Предел меньше одного столбца со всеми таперами: тапера идут группами
+    monkeypatch.setattr(spectrum, "BLOCK_MEMORY", 3 * 8 * 3000)
+    n_fft, chunked = multitaper_power(data, [0, 1, 2], tapers, ratios)
+    assert n_fft == expected[0]
+    np.testing.assert_allclose(chunked, expected[1])
+
+
+def direct_dtft(x, wavenumbers, time_step):
+    """Преобразование Фурье x[n] на частотах в см⁻¹ прямым суммированием"""
+    phase = -2j * np.pi * np.outer(wavenumbers * SPEED_OF_LIGHT * time_step,
+                                   np.arange(len(x)))
+    return np.exp(phase) @ x
+
+
+def test_zoom_spectrum_matches_direct_dtft():
+    time_step = 1e-15
+    band = (500.0, 1500.0, 257)
+    signals = np.random.default_rng(6).normal(size=(300, 2))
+    zoom = partial(zoom_transform, time_step=time_step, freq_min=band[0],
+                   freq_max=band[1], n_points=band[2])
+    freqs = zoom_wavenumbers(*band)
+    direct = np.sqrt(sum(np.abs(direct_dtft(signals[:, k], freqs, time_step)) ** 2
+                         for k in range(2)))
+    np.testing.assert_allclose(zoom_spectrum(signals, zoom), direct, rtol=1e-9)
+
+
+def test_zoom_spectrum_of_acf_matches_even_extension():
+    time_step = 1e-15
+    band = (200.0, 3000.0, 101)
+    acf = autocorrelation(np.random.default_rng(7).normal(size=400), 100).ravel()
+    zoom = partial(zoom_transform, time_step=time_step, freq_min=band[0],
+                   freq_max=band[1], n_points=band[2])
+    freqs = zoom_wavenumbers(*band)
+    # Чётное продолжение: лаги −(L−1)..L−1, значения acf[|k|]
+    even = np.concatenate((acf[:0:-1], acf))
+    lags = np.arange(-(len(acf) - 1), len(acf))
+    phase = -2j * np.pi * np.outer(freqs * SPEED_OF_LIGHT * time_step, lags)
+    direct = np.abs(np.exp(phase) @ even)
+    np.testing.assert_allclose(zoom_spectrum(acf, zoom, from_acf=True), direct,
+                               rtol=1e-9, atol=1e-12 * direct.max())
@@ -0,0 +1,114 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class Cancelled(Exception):
+    """Вычисление прервано, так как его результат больше не нужен"""
+
+
+class JobSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    progress = pyqtSignal(int, int)
+
+
+class Job(QRunnable):
+    """Выполняет func(check_cancelled, report_progress) в пуле потоков"""
+
+    def __init__(self, runner, generation, func):
+        super().__init__()
+        self.runner = runner
+        self.generation = generation
+        self.func = func
+        self.signals = JobSignals()
+
+    def check_cancelled(self):
+        if self.runner.is_stale(self.generation):
+            raise Cancelled()
+
+    def report_progress(self, percent):
+        self.signals.progress.emit(self.generation, percent)
+
+    def run(self):
+        try:
+            self.check_cancelled()
+            result = self.func(self.check_cancelled, self.report_progress)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class JobRunner(QObject):
+    """Фоновые задания с номером поколения.
+
+    Каждое новое задание делает предыдущие устаревшими: ещё не начатые
+    снимаются с очереди, выполняющиеся прерываются на ближайшей проверке,
+    а их результаты отбрасываются. Сигналы finished/failed приходят
+    в GUI-поток только от последнего задания.
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(int)
+
+    def __init__(self, parent=None, max_threads=1):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.generation = 0
+
+    def is_stale(self, generation):
+        return generation != self.generation
+
+    def submit(self, func):
+        self.cancel()
+        job = Job(self, self.generation, func)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.progress.connect(self._on_progress)
+        self.pool.start(job)
+
+    def cancel(self):
+        self.generation += 1
+        self.pool.clear()
+
+    def _on_finished(self, generation, result):
+        if not self.is_stale(generation):
+            self.finished.emit(result)
+
+    def _on_failed(self, generation, message):
+        if not self.is_stale(generation):
+            self.failed.emit(message)
+
+    def _on_progress(self, generation, percent):
+        if not self.is_stale(generation):
+            self.progress.emit(percent)
+
+
+class TaskQueue(QObject):
+    """Фоновые задания, которые не отменяются (сохранение файлов).
+
+    Задания выполняются по очереди в порядке submit(), и сигналы
+    finished/failed приходят от каждого из них.
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+    def is_stale(self, generation):
+        return False
+
+    def submit(self, func):
+        job = Job(self, 0, func)
+        job.signals.finished.connect(lambda generation, result: self.finished.emit(result))
+        job.signals.failed.connect(lambda generation, message: self.failed.emit(message))
+        self.pool.start(job)
+
+    def wait(self, msecs=-1):
+        """Ждёт завершения всех заданий (например, при закрытии окна)"""
+        return self.pool.waitForDone(msecs)
@@ -1,39 +1,89 @@
-# -*- mode: python ; coding: utf-8 -*-
-
-
-a = Analysis(
-    ['123456.py'],
-    pathex=[],
-    binaries=[],
-    datas=[],
-    hiddenimports=[],
-    hookspath=[],
-    hooksconfig={},
-    runtime_hooks=[],
-    excludes=[],
-    noarchive=False,
-    optimize=0,
-)
-pyz = PYZ(a.pure)
-
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='Анализатор спектра',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon=['иконка.ico'],
-)
+# -*- mode: python ; coding: utf-8 -*-
+# Сборка: python build.py (собирает по этому файлу и замеряет время старта)
+import fnmatch
+
+# Модули, которые приложение не использует, но которые подтягиваются
+# зависимостями (тестовые и интерактивные пакеты, другие GUI-библиотеки).
+# Неиспользуемые модули Qt исключаются в hook-PyQt5.py
+EXCLUDED_MODULES = [
+    'tkinter', '_tkinter', 'IPython', 'jupyter_client', 'ipykernel',
+    'setuptools', 'pkg_resources', 'pytest', 'sphinx', 'docutils',
+]
+
+# Файлы сборки, которые не нужны: платформа WebGL тянет Qt Quick, QML,
+# WebSockets и Network; платформы VNC, framebuffer и EGLFS — для встраиваемых
+# систем; ANGLE (libEGL, libGLESv2, d3dcompiler) нужен только для OpenGL;
+# переводы Qt — кроме русского; примеры данных Matplotlib.
+# Имена плагинов в Linux начинаются с lib (libqwebgl.so), в Windows — нет
+EXCLUDED_FILES = [
+    '*/plugins/platforms/*qwebgl*',
+    '*/plugins/platforms/*qminimal*',
+    '*/plugins/platforms/*qvnc*',
+    '*/plugins/platforms/*qlinuxfb*',
+    '*/plugins/platforms/*qeglfs*',
+    '*/plugins/platformthemes/*qxdgdesktopportal*',
+    '*/plugins/generic/*',
+    '*Qt5Quick*', '*Qt5Qml*', '*Qt5WebSockets*',
+    '*/libEGL*', '*/libGLESv2*', '*/d3dcompiler_*',
+    '*/matplotlib/mpl-data/sample_data/*',
+]
+KEPT_TRANSLATIONS = ['*_ru.qm']
+
+
+def keep(dest):
+    dest = dest.replace('\\', '/')
+    if any(fnmatch.fnmatch(dest, pattern) for pattern in EXCLUDED_FILES):
+        return False
+    if '/Qt5/translations/' in dest:
+        return any(fnmatch.fnmatch(dest, pattern) for pattern in KEPT_TRANSLATIONS)
+    return True
+
+
+a = Analysis(
+    ['main.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=['.'],
+    # Только используемые бэкенды: окно (Qt5Agg) и сохранение в файлы
+    hooksconfig={'matplotlib': {'backends': ['Qt5Agg', 'Agg', 'PDF', 'SVG', 'PS']}},
+    runtime_hooks=[],
+    excludes=EXCLUDED_MODULES,
+    noarchive=False,
+    optimize=0,
+)
+a.binaries = [entry for entry in a.binaries if keep(entry[0])]
+a.datas = [entry for entry in a.datas if keep(entry[0])]
+pyz = PYZ(a.pure)
+
+# Сборка в каталог, а не в один файл: однофайловая распаковывает всё
+# во временный каталог при каждом запуске. UPX выключен по той же причине:
+# сжатые библиотеки распаковываются в память при каждой загрузке
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='Анализатор спектра',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['ico.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='programm',
+)